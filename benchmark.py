@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帮会联赛数据处理程序 - 性能基准测试
+功能：生成指定规模的模拟CSV导出数据，分阶段计时整个处理流程，结果保存为JSON便于不同版本之间对比
+
+用法示例：
+    python benchmark.py --rows 100 10000 100000 --output bench_results.json
+    python benchmark.py --rows 10000 --compare bench_results_old.json
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+
+from guild_league_processor_advanced import COLUMNS, SHEET_LAYOUTS, GuildLeagueProcessorAdvanced, StageProfiler
+
+# 模拟数据使用的职业，职业数超过列表长度时自动补充编号职业
+PROFESSIONS = ['素问', '九灵', '铁衣', '碎梦', '神相', '血河', '龙吟', '玄机', '潮光', '沧澜']
+
+def generate_synthetic_csv(csv_file_path, rows, guilds=2, leaders=5, professions=8, seed=0):
+    """生成与游戏导出格式一致的模拟CSV：首行为列标题，各帮会数据之间用空行分隔"""
+    rng = random.Random(seed)
+    profession_names = [PROFESSIONS[i] if i < len(PROFESSIONS) else f'职业{i + 1}' for i in range(professions)]
+    
+    with open(csv_file_path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        
+        for guild_idx in range(guilds):
+            if guild_idx > 0:
+                writer.writerow([])
+            
+            guild_name = f'帮会{guild_idx + 1}'
+            leader_names = [f'{guild_name}团长{i + 1}' for i in range(leaders)]
+            # 行数平均分配给各帮会，余数分给前面的帮会
+            guild_rows = rows // guilds + (1 if guild_idx < rows % guilds else 0)
+            
+            for player_idx in range(guild_rows):
+                profession = rng.choice(profession_names)
+                is_healer = profession == '素问'
+                is_lantern = profession == '九灵'
+                writer.writerow([
+                    guild_name,
+                    f'{guild_name}玩家{player_idx + 1}',
+                    rng.randint(80, 100),
+                    profession,
+                    rng.choice(leader_names),
+                    rng.randint(0, 30),
+                    rng.randint(0, 50),
+                    rng.randint(0, 10),
+                    rng.randint(0, 8000000) if not is_healer else rng.randint(0, 1500000),
+                    rng.randint(0, 2000000),
+                    rng.randint(2000000, 20000000) if is_healer else rng.randint(0, 300000),
+                    rng.randint(0, 10000000),
+                    rng.randint(0, 20),
+                    rng.randint(0, 60) if is_lantern else 0,
+                    rng.randint(0, 15) if is_healer else 0,
+                    rng.randint(0, 80),
+                ])
+
+def profile_pipeline(csv_file_path, output_file, write_only=False, excel_engine='openpyxl', layout='classic'):
+    """开启分阶段计时执行处理流程，返回各阶段的累计耗时（秒）
+    
+    计时时各数据集按顺序计算，不使用线程池；不跟踪内存，避免 tracemalloc 使耗时失真
+    """
+    processor = GuildLeagueProcessorAdvanced(csv_file_path)
+    processor.profiler = StageProfiler(trace_memory=False)
+    processor.profiler.start()
+    if not processor.load_match_data():
+        raise RuntimeError(f"读取CSV文件失败：{csv_file_path}")
+    if excel_engine == 'xlsxwriter':
+        processor.create_excel_file_xlsxwriter(output_file, layout)
+    else:
+        processor.create_excel_file(output_file, write_only=write_only, layout=layout)
+    processor.profiler.stop()
+    
+    timings = {}
+    for record in processor.profiler.stages:
+        timings[record['stage']] = timings.get(record['stage'], 0.0) + record['wall_seconds']
+    # 添加数据条在 format_worksheet 内部测量，单独列出时从 format_worksheet 中扣除
+    timings['format_worksheet'] -= timings.get('add_damage_color_gradient', 0.0)
+    return timings
+
+def run_pipeline(csv_file_path, output_file, write_only=False, excel_engine='openpyxl', layout='classic', dataset_workers=None):
+    """执行完整处理流程并返回各阶段耗时（秒）
+    
+    先开启分阶段计时运行一次得到各阶段耗时，再用 process() 不计时运行一次，
+    其耗时（数据集在线程池中并行计算）记为 total
+    """
+    with redirect_stdout(io.StringIO()):
+        timings = profile_pipeline(csv_file_path, output_file, write_only, excel_engine, layout)
+        
+        processor = GuildLeagueProcessorAdvanced(csv_file_path, dataset_workers=dataset_workers)
+        start = time.perf_counter()
+        if not processor.process(output_file, write_only=write_only, excel_engine=excel_engine, layout=layout):
+            raise RuntimeError(f"处理失败：{csv_file_path}")
+        timings['total'] = time.perf_counter() - start
+    return timings
+
+def get_version_info():
+    """记录代码版本和运行环境，便于对比不同版本的结果"""
+    commit = None
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'openpyxl': openpyxl.__version__,
+        'platform': platform.platform(),
+    }
+
+def compare_results(results, baseline_file):
+    """与之前保存的结果对比，输出各阶段耗时的变化倍数"""
+    with open(baseline_file, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    baseline_runs = {run['rows']: run for run in baseline['runs']}
+    
+    print(f"\n与 {baseline_file}（{baseline['version'].get('commit')}）对比：")
+    for run in results['runs']:
+        old_run = baseline_runs.get(run['rows'])
+        if old_run is None:
+            print(f"{run['rows']} 行：基准结果中没有相同规模的数据")
+            continue
+        print(f"{run['rows']} 行：")
+        for stage, seconds in run['timings'].items():
+            old_seconds = old_run['timings'].get(stage)
+            if old_seconds:
+                print(f"  {stage:<30} {old_seconds:10.4f}s -> {seconds:10.4f}s  ({seconds / old_seconds:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="帮会联赛数据处理程序 - 性能基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000], help="模拟数据的总行数，可指定多个规模")
+    parser.add_argument("--guilds", type=int, default=2, help="帮会数量")
+    parser.add_argument("--leaders", type=int, default=5, help="每个帮会的团长数量")
+    parser.add_argument("--professions", type=int, default=8, help="职业数量")
+    parser.add_argument("--repeat", type=int, default=1, help="每个规模重复次数，各阶段取最小耗时")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--streaming", action="store_true", help="使用流式写入模式")
+    parser.add_argument("--excel-engine", choices=['openpyxl', 'xlsxwriter'], default='openpyxl', help="Excel写入引擎")
+    parser.add_argument("--layout", choices=SHEET_LAYOUTS, default='classic', help="Excel工作表布局")
+    parser.add_argument("--dataset-workers", type=int, default=None, help="计算数据集的线程数（只影响 total），默认与主程序相同")
+    parser.add_argument("--output", default=None, help="结果JSON文件，默认为 bench_results_YYYYMMDD_HHMMSS.json")
+    parser.add_argument("--compare", default=None, help="与之前保存的结果JSON对比")
+    args = parser.parse_args()
+    
+    results = {
+        'version': get_version_info(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'guilds': args.guilds,
+            'leaders': args.leaders,
+            'professions': args.professions,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'streaming': args.streaming,
+            'excel_engine': args.excel_engine,
+            'layout': args.layout,
+            'dataset_workers': args.dataset_workers,
+        },
+        'runs': [],
+    }
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for rows in args.rows:
+            csv_file_path = os.path.join(temp_dir, f'bench_{rows}.csv')
+            output_file = os.path.join(temp_dir, f'bench_{rows}.xlsx')
+            generate_synthetic_csv(csv_file_path, rows, args.guilds, args.leaders, args.professions, args.seed)
+            
+            best = None
+            for _ in range(args.repeat):
+                timings = run_pipeline(csv_file_path, output_file, args.streaming, args.excel_engine, args.layout,
+                                       args.dataset_workers)
+                if best is None:
+                    best = timings
+                else:
+                    best = {stage: min(seconds, timings[stage]) for stage, seconds in best.items()}
+            
+            results['runs'].append({
+                'rows': rows,
+                'csv_bytes': os.path.getsize(csv_file_path),
+                'xlsx_bytes': os.path.getsize(output_file),
+                'timings': best,
+            })
+            
+            print(f"\n{rows} 行：")
+            for stage, seconds in best.items():
+                print(f"  {stage:<30} {seconds:10.4f}s")
+    
+    output_file = args.output or f"bench_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(f"\n基准测试结果已保存：{output_file}")
+    
+    if args.compare:
+        compare_results(results, args.compare)
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
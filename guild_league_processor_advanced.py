@@ -6,575 +6,1868 @@
 """
 
 import csv
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.chart import BarChart, Reference
+import json
+import hashlib
+import importlib.util
+import io
+import mmap
+import pickle
+import re
+import sqlite3
+import sys
+import time
+import tracemalloc
+from copy import copy
+from collections import deque
+from contextlib import contextmanager, nullcontext
 import os
+import glob
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-class GuildLeagueProcessorAdvanced:
+class MissingModule:
+    """未安装模块的占位对象：访问任何属性时才抛出 ModuleNotFoundError，不需要该模块的操作仍可正常运行"""
+    
+    def __init__(self, name):
+        self._name = name
+    
+    def __getattr__(self, attr):
+        raise ModuleNotFoundError(f"No module named '{self._name}'", name=self._name)
+
+def lazy_import(name):
+    """延迟导入模块：首次访问模块属性时才真正执行导入，只做快速汇总等不需要该模块的操作时不付出导入耗时
+    
+    模块未安装时返回 MissingModule，使用时才报错
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# pandas 和 numpy 导入耗时较长，延迟到第一次使用时；openpyxl、xlsxwriter 和 tkinter 在使用它们的函数内导入
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# CSV列定义
+COLUMNS = ['帮会名', '玩家', '等级', '职业', '所在团长', '击败', '助攻', '战备资源',
+           '对玩家伤害', '对建筑伤害', '治疗值', '承受伤害', '重伤', '青灯焚骨', '化羽', '控制']
+NUMERIC_COLUMNS = ['等级', '击败', '助攻', '战备资源', '对玩家伤害', '对建筑伤害',
+                   '治疗值', '承受伤害', '重伤', '青灯焚骨', '化羽', '控制']
+# 取值大量重复的文本列，使用分类类型存储
+CATEGORY_COLUMNS = ['帮会名', '职业', '所在团长']
+
+# 帮会对比表中的各项总计及其对应的数值列
+GUILD_STAT_COLUMNS = {
+    '总击败数': '击败',
+    '总助攻数': '助攻',
+    '总战备资源': '战备资源',
+    '总对玩家伤害': '对玩家伤害',
+    '总对建筑伤害': '对建筑伤害',
+    '总治疗值': '治疗值',
+    '总承受伤害': '承受伤害',
+    '总重伤数': '重伤',
+    '总青灯焚骨': '青灯焚骨',
+    '总化羽数': '化羽',
+    '总控制数': '控制',
+}
+
+# 职业/团长统计行中各数值列的显示格式
+GROUP_STAT_FORMATS = {
+    '击败': '总计: {total}, 平均: {mean:.1f}',
+    '助攻': '总计: {total}, 平均: {mean:.1f}',
+    '战备资源': '总计: {total}',
+    '对玩家伤害': '总计: {total:,.0f}, 平均: {mean:,.0f}',
+    '对建筑伤害': '总计: {total:,.0f}, 平均: {mean:,.0f}',
+    '治疗值': '总计: {total:,.0f}, 平均: {mean:,.0f}',
+    '承受伤害': '总计: {total:,.0f}, 平均: {mean:,.0f}',
+    '重伤': '总计: {total}, 平均: {mean:.1f}',
+    '青灯焚骨': '总计: {total}, 平均: {mean:.1f}',
+    '化羽': '总计: {total}, 平均: {mean:.1f}',
+    '控制': '总计: {total}, 平均: {mean:.1f}',
+}
+
+# 数据条列配置：(列名, 颜色, 限定职业)
+# 限定职业的列在职业表中只对该职业分组生效，在团长表中只对该职业的玩家生效
+DATA_BAR_COLUMNS = [
+    ('击败', 'FF0000', None),        # 红色
+    ('助攻', '00FF00', None),        # 绿色
+    ('对玩家伤害', 'FF0000', None),  # 红色
+    ('对建筑伤害', 'FFFF00', None),  # 黄色
+    ('治疗值', '00FF00', '素问'),    # 绿色（仅素问职业）
+    ('承受伤害', '87CEEB', None),    # 浅蓝色
+    ('重伤', '800080', None),        # 紫色偏红
+    ('青灯焚骨', '800080', '九灵'),  # 紫色（仅九灵职业）
+    ('化羽', 'FFC0CB', '素问'),      # 粉色（仅素问职业）
+    ('控制', '000080', None),        # 深蓝色
+]
+
+# 排名范围：范围名 -> 分组列，空列表表示全部玩家
+RANK_SCOPES = {
+    '职业': ['帮会名', '职业'],
+    '团长': ['帮会名', '所在团长'],
+    '帮会': ['帮会名'],
+    '综合职业': ['职业'],
+    '综合': [],
+}
+# 计算排名的指标列（与数据条列相同）和排名表中的玩家标识列
+RANK_METRIC_COLUMNS = [col for col, _, _ in DATA_BAR_COLUMNS]
+RANKING_ID_COLUMNS = ['帮会名', '玩家', '职业', '所在团长']
+
+# 数据表各类型行使用的命名样式
+ROW_STYLE_NAMES = {
+    'header': '联赛-表头',
+    'data': '联赛-数据',
+    'title': '联赛-分组标题',
+    'stats': '联赛-分组统计',
+    'column_header': '联赛-列标题',
+}
+# 关于程序页面使用的命名样式
+ABOUT_STYLE_NAMES = {
+    'title': '关于-标题',
+    'subtitle': '关于-副标题',
+    'link': '关于-链接',
+    'content': '关于-正文',
+    'border': '关于-边框',
+}
+
+# 各命名样式的格式：字体（加粗、字号、颜色、下划线）、填充色、对齐方式和是否有细边框，两种Excel写入引擎共用
+# 对齐方式 center 为水平垂直居中，top_left 为左上对齐并自动换行
+STYLE_SPECS = {
+    ROW_STYLE_NAMES['header']: {'bold': True, 'color': 'FFFFFF', 'fill': '366092', 'align': 'center', 'border': False},
+    ROW_STYLE_NAMES['data']: {'align': 'center', 'border': True},
+    ROW_STYLE_NAMES['title']: {'bold': True, 'color': 'FFFFFF', 'size': 12, 'fill': '4472C4', 'align': 'center', 'border': True},
+    ROW_STYLE_NAMES['stats']: {'bold': True, 'color': 'FFFFFF', 'fill': '70AD47', 'align': 'center', 'border': True},
+    ROW_STYLE_NAMES['column_header']: {'bold': True, 'color': '000000', 'size': 11, 'fill': 'FFE699', 'align': 'center', 'border': True},
+    ABOUT_STYLE_NAMES['title']: {'bold': True, 'size': 16, 'color': 'FFFFFF', 'fill': '366092', 'align': 'center', 'border': True},
+    ABOUT_STYLE_NAMES['subtitle']: {'bold': True, 'size': 14, 'color': 'FFFFFF', 'fill': '4472C4', 'align': 'center', 'border': True},
+    ABOUT_STYLE_NAMES['link']: {'size': 11, 'color': '0000FF', 'underline': True, 'align': 'top_left', 'border': True},
+    ABOUT_STYLE_NAMES['content']: {'size': 11, 'align': 'top_left', 'border': True},
+    ABOUT_STYLE_NAMES['border']: {'border': True},
+}
+
+# 数据表列宽；统计表只调整数值列的列宽
+SHEET_COLUMN_WIDTHS = {
+    'A': 12, 'B': 14, 'C': 8, 'D': 10, 'E': 14, 'F': 12, 'G': 12, 'H': 14, 'I': 14, 'J': 14, 'K': 14, 'L': 14, 'M': 14, 'N': 14, 'O': 14, 'P': 14
+}
+STATISTICS_COLUMN_WIDTHS = {col: 27 for col in ['F', 'G', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P']}
+ABOUT_COLUMN_WIDTHS = {'A': 20, 'B': 60, 'C': 20}
+
+# 关于程序页面的内容，每行为 A、B、C 三列
+ABOUT_PAGE_CONTENT = [
+    # 标题
+    ("", "帮会联赛数据处理程序 - 高级版", ""),
+    ("", "", ""),
+    
+    # 程序信息
+    ("", "程序信息", ""),
+    ("版本", "高级版 V2.0", ""),
+    ("作者", "VexMare（恶小梦）", ""),
+    ("更新时间", "2025.7.30", ""),
+    ("", "", ""),
+    
+    # 联系方式
+    ("", "联系方式", ""),
+    ("GitHub", "https://github.com/VexMare/NSH_GangWarStats", ""),
+    ("BiliBili", "https://space.bilibili.com/365374856?spm_id_from=333.1007.0.0", ""),
+    ("邮箱", "chixiaotao@foxmail.com", ""),
+    ("", "", ""),
+    
+    # 功能特色
+    ("", "功能特色", ""),
+    ("", "• 智能数据排序：按团长、职业等多种方式排序", ""),
+    ("", "• 颜色可视化：不同数据用不同颜色突出显示", ""),
+    ("", "• 详细统计：包含总计、平均值等统计信息", ""),
+    ("", "• 多工作表：10个不同视角的数据分析", ""),
+    ("", "• 职业特定排序：素问按治疗值，九灵按青灯焚骨", ""),
+    ("", "", ""),
+    
+    # 使用说明
+    ("", "使用说明", ""),
+    ("", "1. 准备CSV文件，确保格式正确（UTF-8编码）", ""),
+    ("", "2. 运行程序，选择CSV文件", ""),
+    ("", "3. 程序自动生成Excel文件，包含10个工作表", ""),
+    ("", "4. 查看不同角度的数据分析结果", ""),
+    ("", "", ""),
+    
+    # 版权声明
+    ("", "版权声明", ""),
+    ("", "本程序采用 MIT 许可证", ""),
+    ("", "", ""),
+    ("", "MIT License", ""),
+    ("", "Copyright (c) 2024 VexMare", ""),
+    ("", "", ""),
+    ("", "Permission is hereby granted, free of charge, to any person obtaining a copy", ""),
+    ("", "of this software and associated documentation files (the \"Software\"), to deal", ""),
+    ("", "in the Software without restriction, including without limitation the rights", ""),
+    ("", "to use, copy, modify, merge, publish, distribute, sublicense, and/or sell", ""),
+    ("", "copies of the Software, and to permit persons to whom the Software is", ""),
+    ("", "furnished to do so, subject to the following conditions:", ""),
+    ("", "", ""),
+    ("", "The above copyright notice and this permission notice shall be included in all", ""),
+    ("", "copies or substantial portions of the Software.", ""),
+    ("", "", ""),
+    ("", "THE SOFTWARE IS PROVIDED \"AS IS\", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR", ""),
+    ("", "IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,", ""),
+    ("", "FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE", ""),
+    ("", "AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER", ""),
+    ("", "LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,", ""),
+    ("", "OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE", ""),
+    ("", "SOFTWARE.", ""),
+    ("", "", ""),
+    
+    # 重要声明
+    ("", "重要声明", ""),
+    ("", "⚠️  禁止商用：本程序仅供学习和个人使用，禁止用于商业用途", ""),
+    ("", "⚠️  免责声明：使用本程序产生的任何后果由用户自行承担", ""),
+    ("", "⚠️  技术支持：如有问题，请通过上述联系方式联系作者", ""),
+    ("", "", ""),
+    
+    # 未来计划
+    ("", "未来计划", ""),
+    ("", "我们即将推出收费版网站服务，提供更便捷的在线数据处理功能。", ""),
+    ("", "如果您有相关开发经验，欢迎加入我们的团队！", ""),
+    ("", "请将您的GitHub链接发送到邮箱：chixiaotao@foxmail.com", ""),
+]
+ABOUT_SUBTITLES = ["程序信息", "联系方式", "功能特色", "使用说明", "版权声明", "重要声明", "未来计划"]
+
+# Excel写入引擎：openpyxl（默认，支持 --streaming）或 xlsxwriter（可选依赖，恒定内存写入）
+EXCEL_ENGINES = ['openpyxl', 'xlsxwriter']
+# 数据表布局：classic 在每个分组前插入空行和标题行；outline 将整张表写成连续的数据块，
+# 分组用Excel的行分级显示（可折叠）区分。outline 布局不开启筛选：各分组的数据条范围和分级显示都按行固定，
+# 在Excel中排序后会与数据错位
+SHEET_LAYOUTS = ['classic', 'outline']
+
+def column_letter(col_idx):
+    """列序号（从1开始）转换为Excel列字母"""
+    letters = ''
+    while col_idx > 0:
+        col_idx, remainder = divmod(col_idx - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def dedupe_names(names):
+    """重复的名称从第二个起依次追加序号 _2、_3……，返回不重复的名称列表（帮会名、输出文件名）"""
+    unique_names = []
+    for name in names:
+        unique_name = name
+        index = 2
+        while unique_name in unique_names:
+            unique_name = f"{name}_{index}"
+            index += 1
+        unique_names.append(unique_name)
+    return unique_names
+
+def parse_number(value):
+    """将CSV中的文本转换为数值，无法转换时返回0"""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return 0
+    return 0 if number != number else number  # NaN 视为 0
+
+def parse_numeric_column(values):
+    """将一列CSV文本整列转换为数值数组，结果与逐个调用 parse_number 相同
+    
+    通常整列都是整数，直接由 numpy 整列转换；含小数或 NaN 时改为浮点数转换，含空值或无法解析的值时才逐个解析
+    """
+    try:
+        return np.array(values, dtype=np.int64)
+    except (ValueError, OverflowError):
+        pass
+    try:
+        array = np.array(values, dtype=np.float64)
+    except ValueError:
+        return np.array([parse_number(value) for value in values])
+    array[np.isnan(array)] = 0
+    return array
+
+# 逐块写出数据框时每块的行数
+FRAME_ROW_CHUNK = 5000
+
+def iter_frame_rows(df, chunk_rows=FRAME_ROW_CHUNK):
+    """逐行产出列标题和各数据行（Python原生类型的列表），每次只转换一块数据，不把整张表复制为列表"""
+    yield list(df.columns)
+    for start in range(0, len(df), chunk_rows):
+        yield from df.iloc[start:start + chunk_rows].to_numpy(dtype=object).tolist()
+
+def compact_dtypes(df):
+    """转换为紧凑的列类型：重复的文本列为分类类型，取值均为整数的数值列为能容纳其取值的最窄整数类型"""
+    if df.empty:
+        return df
+    
+    dtypes = {}
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            dtypes[col] = 'category'
+        elif col in NUMERIC_COLUMNS:
+            # 含小数的列保持 float64；整数列按取值范围缩小为 int8/int16/int32
+            dtypes[col] = pd.to_numeric(df[col], downcast='integer').dtype
+    return df.astype(dtypes)
+
+def write_csv_dataset(df, path):
+    """导出为CSV（带BOM的UTF-8，Excel可直接打开）"""
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+
+def write_parquet_dataset(df, path):
+    """导出为Parquet，需要安装 pyarrow 或 fastparquet"""
+    df.to_parquet(path, index=False)
+
+def write_ndjson_dataset(df, path):
+    """导出为每行一个JSON对象的NDJSON"""
+    df.to_json(path, orient='records', lines=True, force_ascii=False)
+
+# 机器可读的导出格式：格式名 -> (文件扩展名, 写入函数)，均不依赖 openpyxl
+EXPORT_BACKENDS = {
+    'csv': ('.csv', write_csv_dataset),
+    'parquet': ('.parquet', write_parquet_dataset),
+    'ndjson': ('.ndjson', write_ndjson_dataset),
+}
+OUTPUT_FORMATS = ['xlsx'] + list(EXPORT_BACKENDS)
+# 可选依赖：输出格式或Excel写入引擎 -> 可用的库（安装其中之一即可）
+OPTIONAL_DEPENDENCIES = {
+    'parquet': ['pyarrow', 'fastparquet'],
+    'xlsxwriter': ['xlsxwriter'],
+}
+
+def check_output_dependencies(output_format, excel_engine='openpyxl'):
+    """检查输出所需的可选依赖库是否已安装，未安装时抛出 ImportError，在读取数据和创建输出目录之前调用"""
+    requirement = output_format if output_format != 'xlsx' else excel_engine
+    modules = OPTIONAL_DEPENDENCIES.get(requirement)
+    if modules and not any(importlib.util.find_spec(module) for module in modules):
+        raise ImportError(f"缺少依赖库：{requirement} 需要安装 {' 或 '.join(modules)}（pip install {modules[0]}）")
+
+def default_output_path(base_name, output_format):
+    """输出路径：Excel为单个 .xlsx 文件，其他格式为每个数据集一个文件的目录"""
+    if output_format == 'xlsx':
+        return base_name + ".xlsx"
+    return f"{base_name}_{output_format}"
+
+# 默认的职业排序指标：素问按治疗值，九灵按青灯焚骨，其他职业按对玩家伤害
+DEFAULT_RANKING_METRIC = '对玩家伤害'
+DEFAULT_PROFESSION_METRICS = {
+    '素问': '治疗值',
+    '九灵': '青灯焚骨',
+}
+# 程序目录下的排序指标配置文件，存在时自动加载
+RANKING_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ranking_metrics.json')
+
+class RankingMetricRegistry:
+    """职业排序指标注册表
+    
+    每个职业对应一个排序指标：可以是单个数值列名，也可以是加权表达式 {列名: 权重}（各列乘以权重后求和）。
+    未配置的职业使用默认指标。
+    """
+    
+    def __init__(self, profession_metrics=None, default_metric=DEFAULT_RANKING_METRIC):
+        if profession_metrics is None:
+            profession_metrics = DEFAULT_PROFESSION_METRICS
+        self.profession_metrics = dict(profession_metrics)
+        self.default_metric = default_metric
+        
+        self.validate_metric(self.default_metric)
+        for metric in self.profession_metrics.values():
+            self.validate_metric(metric)
+    
+    @classmethod
+    def from_file(cls, config_file):
+        """从JSON配置文件加载，格式：{"default": "对玩家伤害", "professions": {"素问": "治疗值", ...}}"""
+        with open(config_file, 'r', encoding='utf-8') as file:
+            config = json.load(file)
+        return cls(config.get('professions', {}), config.get('default', DEFAULT_RANKING_METRIC))
+    
+    @classmethod
+    def load_default(cls):
+        """加载程序目录下的配置文件，不存在时使用内置规则"""
+        if os.path.exists(RANKING_CONFIG_FILE):
+            return cls.from_file(RANKING_CONFIG_FILE)
+        return cls()
+    
+    def validate_metric(self, metric):
+        """检查排序指标是否只引用了数值列"""
+        if isinstance(metric, str):
+            weights = {metric: 1}
+        elif isinstance(metric, dict) and metric:
+            weights = metric
+        else:
+            raise ValueError(f"排序指标必须是列名或非空的 {{列名: 权重}}：{metric}")
+        
+        for col, weight in weights.items():
+            if col not in NUMERIC_COLUMNS:
+                raise ValueError(f"排序指标引用了无效的列：{col}")
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+                raise ValueError(f"排序指标中列 {col} 的权重必须是数字：{weight}")
+    
+    def evaluate(self, metric, df):
+        """计算一个排序指标在整个数据框上的值"""
+        if isinstance(metric, str):
+            return df[metric]
+        
+        values = None
+        for col, weight in metric.items():
+            # 先转换为 float64 再加权，避免窄整数列相乘时溢出
+            weighted = df[col].astype('float64') * weight
+            values = weighted if values is None else values + weighted
+        return values
+    
+    def compute(self, df):
+        """为每个玩家计算其职业对应的排序指标，整列向量化计算"""
+        sort_key = self.evaluate(self.default_metric, df).to_numpy(dtype='float64')
+        professions = df['职业'].to_numpy()
+        
+        for profession, metric in self.profession_metrics.items():
+            mask = professions == profession
+            if mask.any():
+                sort_key = np.where(mask, self.evaluate(metric, df).to_numpy(dtype='float64'), sort_key)
+        
+        return pd.Series(sort_key, index=df.index)
+
+# 并行计算各工作表数据集的默认线程数
+DEFAULT_DATASET_WORKERS = min(4, os.cpu_count() or 1)
+
+# 缓存格式版本，数据框结构或统计内容变化时递增，使旧缓存失效
+CACHE_VERSION = 1
+DEFAULT_CACHE_MAX_MB = 500
+
+def file_content_hash(file_path):
+    """计算文件内容的SHA-256哈希值"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class MatchDataCache:
+    """以CSV内容哈希为键的比赛数据磁盘缓存
+    
+    每个条目保存各帮会已完成类型转换的数据框及其统计数据。数据框以pandas的pickle格式按列块存储，
+    读取时无需重新解析和转换类型。缓存总大小超过上限时，按最近使用时间淘汰最旧的条目。
+    """
+    
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+    
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.v{CACHE_VERSION}.pkl")
+    
+    def get(self, key):
+        """读取缓存条目，不存在或已损坏时返回None"""
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"警告：缓存文件已损坏，将重新解析：{e}")
+            self.remove(path)
+            return None
+        
+        # 更新访问时间，用于按最近使用淘汰
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+    
+    def put(self, key, entry):
+        """写入缓存条目并按大小上限淘汰旧条目"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self.evict()
+    
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def evict(self):
+        """缓存总大小超过上限时，删除最久未使用的条目"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            self.remove(path)
+            total_size -= size
+
+# 赛季历史库中趋势查询输出的数值列
+TREND_COLUMNS = ['击败', '助攻', '对玩家伤害', '对建筑伤害', '治疗值', '承受伤害', '重伤', '青灯焚骨', '化羽', '控制']
+
+def match_date_from_name(file_name):
+    """文件名中的日期（如 20250730 或 2025-07-30），没有时返回 None"""
+    match = re.search(r'(20\d{2})[-_.]?(\d{2})[-_.]?(\d{2})', os.path.basename(file_name))
+    if match:
+        try:
+            return datetime(*map(int, match.groups())).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+def match_date_for_file(csv_file_path):
+    """比赛日期：优先取文件名中的日期，否则取文件修改日期"""
+    match_date = match_date_from_name(csv_file_path)
+    if match_date is not None:
+        return match_date
+    return datetime.fromtimestamp(os.path.getmtime(csv_file_path)).date().isoformat()
+
+class SeasonHistoryStore:
+    """本地赛季历史库（SQLite）
+    
+    每场比赛追加一条比赛记录和所有玩家的数据行，以CSV内容哈希去重。玩家、帮会、职业和比赛日期均有索引，
+    跨场次的玩家和帮会趋势直接查询数据库，无需重新解析旧的CSV文件。
+    """
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+    
+    def connect(self):
+        # 批量模式下多个进程可能同时写入，等待锁释放而不是立即失败
+        connection = sqlite3.connect(self.db_path, timeout=60)
+        self.create_schema(connection)
+        return connection
+    
+    def create_schema(self, connection):
+        player_columns = ', '.join(
+            f'"{col}" {"NUMERIC" if col in NUMERIC_COLUMNS else "TEXT"}' for col in COLUMNS
+        )
+        connection.executescript(f'''
+            CREATE TABLE IF NOT EXISTS matches (
+                match_id INTEGER PRIMARY KEY,
+                csv_hash TEXT NOT NULL UNIQUE,
+                source_file TEXT NOT NULL,
+                "比赛日期" TEXT NOT NULL,
+                "帮会" TEXT NOT NULL,
+                imported_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS player_stats (
+                match_id INTEGER NOT NULL REFERENCES matches(match_id),
+                "比赛日期" TEXT NOT NULL,
+                {player_columns}
+            );
+            CREATE INDEX IF NOT EXISTS idx_matches_date ON matches("比赛日期");
+            CREATE INDEX IF NOT EXISTS idx_player_stats_player ON player_stats("玩家", "比赛日期");
+            CREATE INDEX IF NOT EXISTS idx_player_stats_guild ON player_stats("帮会名", "比赛日期");
+            CREATE INDEX IF NOT EXISTS idx_player_stats_profession ON player_stats("职业", "比赛日期");
+            CREATE INDEX IF NOT EXISTS idx_player_stats_date ON player_stats("比赛日期");
+        ''')
+    
+    def add_match(self, csv_file_path, guild_names, guild_dfs, match_date=None, source_file=None):
+        """追加一场比赛，相同内容的CSV只记录一次；返回是否新增
+        
+        source_file 为记录的来源文件，默认为CSV文件的绝对路径
+        """
+        csv_hash = file_content_hash(csv_file_path)
+        if match_date is None:
+            match_date = match_date_for_file(csv_file_path)
+        if source_file is None:
+            source_file = os.path.abspath(csv_file_path)
+        
+        placeholders = ', '.join('?' * (len(COLUMNS) + 2))
+        column_names = ', '.join(f'"{col}"' for col in COLUMNS)
+        
+        connection = self.connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO matches (csv_hash, source_file, "比赛日期", "帮会", imported_at) VALUES (?, ?, ?, ?, ?)',
+                    (csv_hash, source_file, match_date, json.dumps(guild_names, ensure_ascii=False),
+                     datetime.now().isoformat(timespec='seconds'))
+                )
+                if cursor.rowcount == 0:
+                    return False
+                
+                match_id = cursor.lastrowid
+                for df in guild_dfs:
+                    # 转换为Python原生类型（分类列为字符串、窄整数为int），sqlite3 不接受 numpy 标量
+                    rows = df[COLUMNS].to_numpy(dtype=object).tolist()
+                    connection.executemany(
+                        f'INSERT INTO player_stats (match_id, "比赛日期", {column_names}) VALUES ({placeholders})',
+                        [[match_id, match_date] + row for row in rows]
+                    )
+            return True
+        finally:
+            connection.close()
+    
+    def player_trend(self, player):
+        """一名玩家在各场比赛中的数据，按比赛日期排序"""
+        columns = ', '.join(f'"{col}"' for col in ['帮会名', '职业', '所在团长'] + TREND_COLUMNS)
+        connection = self.connect()
+        try:
+            return pd.read_sql_query(
+                f'SELECT "比赛日期", {columns} FROM player_stats WHERE "玩家" = ? ORDER BY "比赛日期", match_id',
+                connection, params=(player,)
+            )
+        finally:
+            connection.close()
+    
+    def guild_trend(self, guild):
+        """一个帮会在各场比赛中的人数和各项总计，按比赛日期排序"""
+        totals = ', '.join(f'SUM("{col}") AS "总{col}"' for col in TREND_COLUMNS)
+        connection = self.connect()
+        try:
+            return pd.read_sql_query(
+                f'SELECT "比赛日期", COUNT(*) AS "人数", {totals} FROM player_stats WHERE "帮会名" = ? '
+                f'GROUP BY match_id ORDER BY "比赛日期", match_id',
+                connection, params=(guild,)
+            )
+        finally:
+            connection.close()
+
+# 赛季累计统计的数值列，以及各累计表：表名 -> (分组列, 是否记录人次)
+ROLLUP_COLUMNS = TREND_COLUMNS
+ROLLUP_TABLES = {
+    'rollup_players': (['帮会名', '玩家'], False),
+    'rollup_leaders': (['帮会名', '所在团长'], True),
+    'rollup_professions': (['帮会名', '职业'], True),
+}
+
+class SeasonRollup:
+    """赛季累计统计（SQLite状态文件）
+    
+    按帮会和玩家、帮会和团长、帮会和职业分别保存参赛场次、各项数据的累计总和与单场最高值，以CSV内容哈希去重。
+    加入一场比赛只按主键更新这场比赛涉及的行，耗时只与这场比赛的数据量有关，无需重新读取之前的导出文件；
+    赛季排行榜直接由累计结果生成。
+    """
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+    
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=60)
+        self.create_schema(connection)
+        return connection
+    
+    def create_schema(self, connection):
+        metric_columns = ', '.join(f'"{col}总计" NUMERIC NOT NULL, "{col}最高" NUMERIC NOT NULL' for col in ROLLUP_COLUMNS)
+        script = '''
+            CREATE TABLE IF NOT EXISTS rollup_matches (
+                csv_hash TEXT PRIMARY KEY,
+                source_file TEXT NOT NULL,
+                "比赛日期" TEXT NOT NULL,
+                added_at TEXT NOT NULL
+            );
+        '''
+        for table, (keys, count_players) in ROLLUP_TABLES.items():
+            key_columns = ', '.join(f'"{key}" TEXT NOT NULL' for key in keys)
+            primary_key = ', '.join(f'"{key}"' for key in keys)
+            # 玩家表另外记录最近一场（比赛日期最晚的一场）的比赛日期、职业和所在团长，团长表和职业表记录累计人次
+            extra_columns = '"人次" INTEGER NOT NULL' if count_players else '"职业" TEXT, "所在团长" TEXT, "最近比赛日期" TEXT'
+            script += f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key_columns}, {extra_columns}, "场次" INTEGER NOT NULL, {metric_columns},
+                PRIMARY KEY ({primary_key})
+            );
+            '''
+        connection.executescript(script)
+    
+    def has_match(self, csv_hash):
+        """是否已累加过该内容的比赛"""
+        connection = self.connect()
+        try:
+            return connection.execute('SELECT 1 FROM rollup_matches WHERE csv_hash = ?', (csv_hash,)).fetchone() is not None
+        finally:
+            connection.close()
+    
+    def match_count(self):
+        """已累加的比赛场数"""
+        connection = self.connect()
+        try:
+            return connection.execute('SELECT COUNT(*) FROM rollup_matches').fetchone()[0]
+        finally:
+            connection.close()
+    
+    def add_match(self, csv_file_path, guild_dfs, match_date=None, csv_hash=None):
+        """把一场比赛累加到状态文件中，相同内容的CSV只累加一次；返回是否新增"""
+        if csv_hash is None:
+            csv_hash = file_content_hash(csv_file_path)
+        if match_date is None:
+            match_date = match_date_for_file(csv_file_path)
+        
+        connection = self.connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO rollup_matches (csv_hash, source_file, "比赛日期", added_at) VALUES (?, ?, ?, ?)',
+                    (csv_hash, os.path.abspath(csv_file_path), match_date, datetime.now().isoformat(timespec='seconds'))
+                )
+                if cursor.rowcount == 0:
+                    return False
+                for df in guild_dfs:
+                    for table in ROLLUP_TABLES:
+                        self.upsert_group_totals(connection, table, df, match_date)
+            return True
+        finally:
+            connection.close()
+    
+    def upsert_group_totals(self, connection, table, df, match_date):
+        """在本场数据中按分组汇总后逐组累加到状态表，状态表中还没有的分组直接插入"""
+        keys, count_players = ROLLUP_TABLES[table]
+        grouped = df.groupby(keys, sort=False, observed=True)
+        sums = grouped[ROLLUP_COLUMNS].sum()
+        maxima = grouped[ROLLUP_COLUMNS].max()
+        
+        rows = sums.index.to_frame(index=False).astype(str)
+        if count_players:
+            # 人次为本场该分组的玩家数，场次每场加一
+            rows['人次'] = grouped.size().to_numpy()
+            rows['场次'] = 1
+            updates = ['"人次" = "人次" + excluded."人次"']
+        else:
+            # 玩家的场次为本场出现的行数（通常为1）；本场的比赛日期不早于已记录的最近一场时，
+            # 职业和所在团长更新为本场的值，按日期补录较早的比赛不会覆盖
+            latest = grouped[['职业', '所在团长']].last()
+            rows['职业'] = latest['职业'].astype(str).to_numpy()
+            rows['所在团长'] = latest['所在团长'].astype(str).to_numpy()
+            rows['最近比赛日期'] = match_date
+            rows['场次'] = grouped.size().to_numpy()
+            is_latest = 'excluded."最近比赛日期" >= COALESCE("最近比赛日期", \'\')'
+            updates = [f'"{col}" = CASE WHEN {is_latest} THEN excluded."{col}" ELSE "{col}" END'
+                       for col in ['职业', '所在团长', '最近比赛日期']]
+        updates.append('"场次" = "场次" + excluded."场次"')
+        for col in ROLLUP_COLUMNS:
+            rows[f'{col}总计'] = sums[col].to_numpy()
+            rows[f'{col}最高'] = maxima[col].to_numpy()
+            updates.append(f'"{col}总计" = "{col}总计" + excluded."{col}总计"')
+            updates.append(f'"{col}最高" = MAX("{col}最高", excluded."{col}最高")')
+        
+        column_names = ', '.join(f'"{col}"' for col in rows.columns)
+        placeholders = ', '.join('?' * len(rows.columns))
+        conflict_keys = ', '.join(f'"{key}"' for key in keys)
+        connection.executemany(
+            f'INSERT INTO {table} ({column_names}) VALUES ({placeholders}) '
+            f'ON CONFLICT ({conflict_keys}) DO UPDATE SET {", ".join(updates)}',
+            # 转换为Python原生类型，sqlite3 不接受 numpy 标量
+            rows.to_numpy(dtype=object).tolist()
+        )
+    
+    def leaderboard_datasets(self):
+        """赛季排行榜的数据集 [(工作表名, 数据框)]：玩家按对玩家伤害总计排序，团长和职业为各帮会内的汇总"""
+        per_match = ', '.join(f'"{col}总计", ROUND(1.0 * "{col}总计" / "场次", 1) AS "{col}场均", "{col}最高"'
+                              for col in ROLLUP_COLUMNS)
+        per_player = ', '.join(f'"{col}总计", ROUND(1.0 * "{col}总计" / "人次", 1) AS "{col}人均", "{col}最高"'
+                               for col in ROLLUP_COLUMNS)
+        queries = [
+            ("赛季玩家排行", f'SELECT "帮会名", "玩家", "职业", "所在团长", "场次", {per_match} FROM rollup_players '
+                            f'ORDER BY "对玩家伤害总计" DESC, "帮会名", "玩家"'),
+            ("赛季团长汇总", f'SELECT "帮会名", "所在团长", "场次", "人次", {per_player} FROM rollup_leaders '
+                            f'ORDER BY "帮会名", "对玩家伤害总计" DESC'),
+            ("赛季职业汇总", f'SELECT "帮会名", "职业", "场次", "人次", {per_player} FROM rollup_professions '
+                            f'ORDER BY "帮会名", "对玩家伤害总计" DESC'),
+        ]
+        connection = self.connect()
+        try:
+            return [(sheet_name, pd.read_sql_query(query, connection)) for sheet_name, query in queries]
+        finally:
+            connection.close()
+
+class StageProfiler:
+    """分阶段性能分析：记录每个阶段的耗时、CPU时间和内存峰值，以及每个工作表的行数、单元格数
+    
+    trace_memory 为False时不跟踪内存（tracemalloc 会明显拖慢处理），只计时，内存峰值均为0
+    """
+    
+    def __init__(self, trace_memory=True):
+        self.stages = []
+        self.sheets = {}
+        self.peak_stack = []
+        self.trace_memory = trace_memory
+        self.started_tracing = False
+    
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+    
+    def stop(self):
+        self.total_wall = time.perf_counter() - self.start_wall
+        self.total_cpu = time.process_time() - self.start_cpu
+        self.total_peak = tracemalloc.get_traced_memory()[1]
+        if self.started_tracing:
+            tracemalloc.stop()
+    
+    @contextmanager
+    def stage(self, name, sheet_name=None):
+        """测量一个阶段；阶段可以嵌套，内层阶段的内存峰值会计入外层"""
+        start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.peak_stack.append(start_memory)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            peak = max(tracemalloc.get_traced_memory()[1], self.peak_stack.pop())
+            if self.peak_stack:
+                # 内层阶段重置了峰值，把本阶段的峰值传递给外层阶段
+                self.peak_stack[-1] = max(self.peak_stack[-1], peak)
+            
+            record = {
+                'stage': name,
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                'peak_memory_bytes': peak - start_memory,
+            }
+            if sheet_name is not None:
+                record['sheet'] = sheet_name
+                sheet = self.sheets.setdefault(sheet_name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_memory_bytes': 0})
+                sheet['wall_seconds'] = round(sheet['wall_seconds'] + wall, 6)
+                sheet['cpu_seconds'] = round(sheet['cpu_seconds'] + cpu, 6)
+                sheet['peak_memory_bytes'] = max(sheet['peak_memory_bytes'], peak - start_memory)
+            self.stages.append(record)
+    
+    def record_sheet(self, sheet_name, rows, columns, rules):
+        """记录工作表的规模"""
+        sheet = self.sheets.setdefault(sheet_name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_memory_bytes': 0})
+        sheet.update({'rows': rows, 'columns': columns, 'cells': rows * columns, 'conditional_format_rules': rules})
+    
+    def report(self, csv_file_path, output_file):
+        return {
+            'csv_file': csv_file_path,
+            'output_file': output_file,
+            'total_wall_seconds': round(self.total_wall, 6),
+            'total_cpu_seconds': round(self.total_cpu, 6),
+            'peak_memory_bytes': self.total_peak,
+            'stages': self.stages,
+            'sheets': [{'sheet': name, **info} for name, info in self.sheets.items()],
+        }
+
+# 帮会数据块索引文件的格式版本，格式变化时旧索引自动失效
+BLOCK_INDEX_VERSION = 1
+BLOCK_INDEX_SUFFIX = '.blocks.json'
+# 帮会数据块之间的分隔行：只含空白和逗号的行（匹配位置为分隔行之前的换行符）
+BLOCK_SEPARATOR_PATTERN = re.compile(rb'\n[ \t\r,]*(?=\n)')
+
+class CsvBlockIndex:
+    """CSV文件中各帮会数据块的字节偏移索引，用于只读取指定帮会的数据
+    
+    用内存映射在整个文件中查找空行分隔符，每个数据块记录帮会名和 [起始, 结束) 字节偏移；
+    索引保存在CSV文件旁，文件大小和修改时间未变时直接使用，无需再次扫描。
+    与 read_csv_data 一样，重名的帮会追加序号；文件中没有空行分隔符时不建立索引。
+    """
+    
     def __init__(self, csv_file_path):
         self.csv_file_path = csv_file_path
-        self.data = []
-        self.guild1_data = []
-        self.guild2_data = []
+        self.index_path = csv_file_path + BLOCK_INDEX_SUFFIX
+    
+    def load(self):
+        """返回 [{'name', 'start', 'end'}]，没有空行分隔符时返回 None"""
+        stat = os.stat(self.csv_file_path)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+            if (index.get('version') == BLOCK_INDEX_VERSION and index.get('size') == stat.st_size
+                    and index.get('mtime_ns') == stat.st_mtime_ns):
+                return index['blocks']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"警告：帮会索引文件无法读取，将重新建立：{e}")
         
+        blocks = self.build()
+        try:
+            with open(self.index_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': BLOCK_INDEX_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                           'blocks': blocks}, file, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"警告：保存帮会索引失败：{e}")
+        return blocks
+    
+    def build(self):
+        """扫描整个文件建立索引，只在分隔行和各数据块的第一行做解析"""
+        with open(self.csv_file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                # 第一行为列标题
+                header_end = data.find(b'\n')
+                if header_end < 0:
+                    return []
+                
+                segments = []
+                position = header_end + 1
+                for match in BLOCK_SEPARATOR_PATTERN.finditer(data, header_end):
+                    separator_start = match.start() + 1
+                    segments.append((position, separator_start))
+                    position = match.end() + 1
+                if not segments:
+                    return None
+                segments.append((position, len(data)))
+                
+                blocks = []
+                for start, end in segments:
+                    name = self.block_guild_name(data, start, end)
+                    if name is not None:
+                        blocks.append({'name': name, 'start': start, 'end': end})
+                for block, unique_name in zip(blocks, dedupe_names([block['name'] for block in blocks])):
+                    block['name'] = unique_name
+                return blocks
+    
+    def block_guild_name(self, data, start, end):
+        """逐行查找数据块中第一个非空的帮会名；数据块中没有数据行时返回 None"""
+        has_data = False
+        position = start
+        while position < end:
+            line_end = data.find(b'\n', position, end)
+            if line_end < 0:
+                line_end = end
+            row = next(csv.reader([data[position:line_end].decode('utf-8')]), [])
+            position = line_end + 1
+            
+            if not row or all(cell.strip() == '' for cell in row) or row[0].strip() == '帮会名':
+                continue
+            has_data = True
+            if row[0].strip():
+                return row[0].strip()
+        return "未知帮会" if has_data else None
+
+class GuildLeagueProcessorAdvanced:
+    def __init__(self, csv_file_path, ranking_metrics=None, cache=None, history=None, dataset_workers=None, guilds=None):
+        self.csv_file_path = csv_file_path
+        if ranking_metrics is None:
+            ranking_metrics = RankingMetricRegistry.load_default()
+        self.ranking_metrics = ranking_metrics
+        self.cache = cache
+        self.history = history
+        if dataset_workers is None:
+            dataset_workers = DEFAULT_DATASET_WORKERS
+        self.dataset_workers = dataset_workers
+        # 只处理指定的帮会（按帮会名），为 None 时处理文件中的所有帮会
+        self.guilds = guilds
+        self.guild_blocks = []
+        self.guild_names = []
+        self.guild_dfs = []
+        self.guild_stats = []
+        # 各排名范围内每个分组各指标的最高值，由 prepare_sorted_views 计算
+        self.group_best = {}
+        self.profiler = None
+    
+    def profile_stage(self, name, sheet_name=None):
+        """性能分析模式下测量一个阶段，未开启时不做任何事"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name, sheet_name)
+    
+    def new_block_columns(self):
+        """创建一个帮会数据块的空列存储"""
+        return {col: [] for col in COLUMNS}
+    
+    def append_row(self, block, row):
+        """将一行CSV数据按列追加到数据块中，多余的列忽略，缺少的列为空；数值列在 create_dataframe 中整列转换"""
+        if len(row) < len(COLUMNS):
+            row = row + [''] * (len(COLUMNS) - len(row))
+        for values, value in zip(block.values(), row):
+            values.append(value)
+    
+    def slice_block(self, block, start, stop=None):
+        """截取数据块中的部分行"""
+        return {col: values[start:stop] for col, values in block.items()}
+    
+    def block_row_count(self, block):
+        """数据块的行数"""
+        return len(block['玩家'])
+    
     def read_csv_data(self):
-        """读取CSV文件数据"""
+        """流式读取CSV文件数据，一次扫描即按空行把数据分割为任意数量的帮会数据块"""
         try:
+            blocks = []
+            current_block = self.new_block_columns()
+            separator_found = False
+            fallback_split = None
+            
             with open(self.csv_file_path, 'r', encoding='utf-8') as file:
                 reader = csv.reader(file)
-                self.data = list(reader)
+                for i, row in enumerate(reader):
+                    if not row or all(cell.strip() == '' for cell in row):
+                        # 空行分隔符：结束当前帮会数据块，连续空行不会产生空数据块
+                        separator_found = True
+                        if self.block_row_count(current_block):
+                            blocks.append(current_block)
+                            current_block = self.new_block_columns()
+                        continue
+                    if i == 0:
+                        continue  # 第一行为列标题
+                    
+                    # 过滤掉标题行
+                    is_data_row = row[0].strip() != '帮会名'
+                    
+                    if not separator_found and i == 91:
+                        # 记录默认第92行的位置，整个文件都没有空行时按此位置分割
+                        row_count = self.block_row_count(current_block)
+                        fallback_split = (row_count, row_count + 1 if is_data_row else row_count)
+                    
+                    if is_data_row:
+                        self.append_row(current_block, row)
             
-            # 找到空行分隔符
-            separator_line = None
-            for i, row in enumerate(self.data):
-                if not row or all(cell.strip() == '' for cell in row):
-                    separator_line = i
-                    break
+            if self.block_row_count(current_block):
+                blocks.append(current_block)
             
-            if separator_line is None:
+            if not separator_found:
                 print("警告：未找到空行分隔符，使用默认第92行")
-                separator_line = 91
+                if fallback_split is not None and blocks:
+                    # 第92行之前属于第一个帮会，之后属于第二个帮会，第92行本身被丢弃
+                    split_start, split_stop = fallback_split
+                    block = blocks[0]
+                    blocks = [self.slice_block(block, 0, split_start), self.slice_block(block, split_stop)]
+                    blocks = [block for block in blocks if self.block_row_count(block)]
+            
+            if not blocks:
+                print("读取CSV文件时出错：文件中没有帮会数据")
+                return False
             
-            # 分离两个帮会的数据，过滤掉空行和标题行
-            self.guild1_data = [row for row in self.data[1:separator_line] if row and any(cell.strip() for cell in row) and row[0].strip() != '帮会名']
-            self.guild2_data = [row for row in self.data[separator_line + 1:] if row and any(cell.strip() for cell in row) and row[0].strip() != '帮会名']
+            self.guild_blocks = blocks
             
-            # 提取帮会名
-            self.guild1_name = self.extract_guild_name(self.guild1_data)
-            self.guild2_name = self.extract_guild_name(self.guild2_data)
+            # 提取帮会名，重名的帮会追加序号以区分工作表
+            self.guild_names = dedupe_names([self.extract_guild_name(block) for block in blocks])
             
             print(f"成功读取数据：")
-            print(f"帮会1：{self.guild1_name}，数据行数：{len(self.guild1_data)}")
-            print(f"帮会2：{self.guild2_name}，数据行数：{len(self.guild2_data)}")
+            for i, (name, block) in enumerate(zip(self.guild_names, self.guild_blocks), 1):
+                print(f"帮会{i}：{name}，数据行数：{self.block_row_count(block)}")
             
         except Exception as e:
             print(f"读取CSV文件时出错：{e}")
             return False
         return True
     
-    def extract_guild_name(self, data):
-        """从数据中提取帮会名"""
-        if not data:
-            return "未知帮会"
-        
-        # 查找第一个非空行的帮会名
-        for row in data:
-            if row and len(row) > 0 and row[0].strip() and row[0].strip() != '帮会名':
-                return row[0].strip()
+    def extract_guild_name(self, block):
+        """从数据块中提取帮会名"""
+        # 查找第一个非空的帮会名
+        for name in block['帮会名']:
+            if name.strip() and name.strip() != '帮会名':
+                return name.strip()
         
         return "未知帮会"
     
-    def create_dataframe(self, data, guild_name):
-        """创建DataFrame"""
-        columns = ['帮会名', '玩家', '等级', '职业', '所在团长', '击败', '助攻', '战备资源', 
-                  '对玩家伤害', '对建筑伤害', '治疗值', '承受伤害', '重伤', '青灯焚骨', '化羽', '控制']
-        
-        df = pd.DataFrame(data, columns=columns)
+    def create_dataframe(self, block, guild_name):
+        """由列数据创建DataFrame，数值列整列转换类型，并转换为紧凑的列类型"""
+        columns = {col: parse_numeric_column(values) if col in NUMERIC_COLUMNS else values for col, values in block.items()}
+        df = pd.DataFrame(columns, columns=COLUMNS)
         df['帮会名'] = guild_name
         
-        # 转换数值列
-        numeric_columns = ['等级', '击败', '助攻', '战备资源', '对玩家伤害', '对建筑伤害', 
-                          '治疗值', '承受伤害', '重伤', '青灯焚骨', '化羽', '控制']
+        if df.empty:
+            df = df.astype({col: 'float64' for col in NUMERIC_COLUMNS})
         
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        return compact_dtypes(df)
+    
+    def group_boundaries(self, sorted_df, group_column):
+        """返回 (每一行所属的分组序号, 各分组第一行的位置)，分组值发生变化处即为新分组的开始"""
+        keys = sorted_df[group_column].to_numpy()
+        is_group_start = np.empty(len(keys), dtype=bool)
+        is_group_start[:1] = True
+        is_group_start[1:] = keys[1:] != keys[:-1]
+        return np.cumsum(is_group_start) - 1, np.flatnonzero(is_group_start)
+    
+    def group_header_layout(self, sheet_name, layout='classic'):
+        """返回工作表中 (每个分组前的标题行数, 分组之间的空行数)
         
-        return df
+        classic 布局的统计表每个分组前有标题行、统计行、列标题行，排序表有列标题行，分组之间空一行；
+        outline 布局的统计表只保留统计行，排序表不插入任何行
+        """
+        if layout == 'outline':
+            return (1 if "统计" in sheet_name else 0), 0
+        return (3 if "统计" in sheet_name else 1), 1
     
-    def sort_by_leader(self, df):
-        """按团长排序，添加分割线"""
-        sorted_df = df.sort_values(['所在团长', '对玩家伤害'], ascending=[True, False])
-        
-        # 创建带分割线的数据
-        result_list = []
-        current_leader = None
-        
-        for _, row in sorted_df.iterrows():
-            if row['所在团长'] != current_leader:
-                # 添加分割线
-                if current_leader is not None:  # 不是第一个团长
-                    # 添加空行
-                    empty_row = pd.DataFrame([{
-                        '帮会名': '',
-                        '玩家': '',
-                        '等级': '',
-                        '职业': '',
-                        '所在团长': '',
-                        '击败': '',
-                        '助攻': '',
-                        '战备资源': '',
-                        '对玩家伤害': '',
-                        '对建筑伤害': '',
-                        '治疗值': '',
-                        '承受伤害': '',
-                        '重伤': '',
-                        '青灯焚骨': '',
-                        '化羽': '',
-                        '控制': ''
-                    }])
-                    result_list.append(empty_row)
-                
-                # 添加标题行
-                title_row = pd.DataFrame([{
-                    '帮会名': '帮会名',
-                    '玩家': '玩家',
-                    '等级': '等级',
-                    '职业': '职业',
-                    '所在团长': '所在团长',
-                    '击败': '击败',
-                    '助攻': '助攻',
-                    '战备资源': '战备资源',
-                    '对玩家伤害': '对玩家伤害',
-                    '对建筑伤害': '对建筑伤害',
-                    '治疗值': '治疗值',
-                    '承受伤害': '承受伤害',
-                    '重伤': '重伤',
-                    '青灯焚骨': '青灯焚骨',
-                    '化羽': '化羽',
-                    '控制': '控制'
-                }])
-                result_list.append(title_row)
-                current_leader = row['所在团长']
-            
-            # 添加数据行
-            result_list.append(pd.DataFrame([row]))
+    def insert_group_separators(self, sorted_df, group_column, group_header_rows=None, separate_groups=True):
+        """根据排序后的分组边界一次性插入空行和标题行
         
-        return pd.concat(result_list, ignore_index=True)
+        group_header_rows 为每个分组前插入的行，形状为（分组数, 每组行数, 列数），默认只插入列标题行；
+        separate_groups 为 False 时分组之间不插入空行
+        """
+        columns = list(sorted_df.columns)
+        row_count = len(sorted_df)
+        if row_count == 0:
+            return pd.DataFrame(columns=columns)
+        
+        group_ids, group_starts = self.group_boundaries(sorted_df, group_column)
+        group_count = len(group_starts)
+        
+        if group_header_rows is None:
+            group_header_rows = np.empty((group_count, 1, len(columns)), dtype=object)
+            group_header_rows[:, 0, :] = columns
+        header_count = group_header_rows.shape[1]
+        
+        # 每个分组前有若干标题行，除第一个分组外标题行前还有一个空行
+        gap = header_count + (1 if separate_groups else 0)
+        header_starts = group_starts + gap * np.arange(group_count)
+        data_positions = np.arange(row_count) + gap * group_ids + header_count
+        
+        result = np.empty((row_count + gap * group_count - (gap - header_count), len(columns)), dtype=object)
+        result[data_positions] = sorted_df.to_numpy(dtype=object)
+        for offset in range(header_count):
+            result[header_starts + offset] = group_header_rows[:, offset, :]
+        if separate_groups:
+            result[header_starts[1:] - 1] = ''
+        
+        return pd.DataFrame(result, columns=columns)
     
-    def sort_by_profession(self, df):
-        """按职业排序，添加分割线"""
-        # 根据不同职业使用不同的排序指标
-        def get_sort_key(row):
-            profession = row['职业']
-            if profession == '素问':
-                return row['治疗值']
-            elif profession == '九灵':
-                return row['青灯焚骨']
-            else:
-                return row['对玩家伤害']
+    def outline_levels(self, sheet_name, sorted_df, group_column):
+        """outline 布局中各行（不含第1行列标题）的分级显示级别
         
-        # 添加排序键列
+        统计表各分组的玩家行归入该分组的统计行之下；排序表各分组除第一名外的玩家行归入第一名之下，
+        折叠后只显示各分组的第一名
+        """
+        group_ids, group_starts = self.group_boundaries(sorted_df, group_column)
+        header_count, _ = self.group_header_layout(sheet_name, 'outline')
+        levels = np.zeros(len(sorted_df) + header_count * len(group_starts), dtype=np.int8)
+        levels[np.arange(len(sorted_df)) + header_count * group_ids + header_count] = 1
+        if header_count == 0:
+            levels[group_starts] = 0
+        return levels
+    
+    def sort_leader_frame(self, df):
+        """按团长排序，团内按对玩家伤害从高到低"""
+        return df.sort_values(['所在团长', '对玩家伤害'], ascending=[True, False])
+    
+    def sort_profession_frame(self, df):
+        """按职业排序，职业内按该职业的排序指标从高到低"""
+        # 根据排序指标注册表为每个玩家计算排序键
         df_with_sort_key = df.copy()
-        df_with_sort_key['sort_key'] = df_with_sort_key.apply(get_sort_key, axis=1)
+        df_with_sort_key['sort_key'] = self.ranking_metrics.compute(df)
         
-        # 按职业和排序键排序
+        # 按职业和排序键排序（移除排序键列）
         sorted_df = df_with_sort_key.sort_values(['职业', 'sort_key'], ascending=[True, False])
-        
-        # 创建带分割线的数据
-        result_list = []
-        current_profession = None
-        
-        for _, row in sorted_df.iterrows():
-            if row['职业'] != current_profession:
-                # 添加分割线
-                if current_profession is not None:  # 不是第一个职业
-                    # 添加空行
-                    empty_row = pd.DataFrame([{
-                        '帮会名': '',
-                        '玩家': '',
-                        '等级': '',
-                        '职业': '',
-                        '所在团长': '',
-                        '击败': '',
-                        '助攻': '',
-                        '战备资源': '',
-                        '对玩家伤害': '',
-                        '对建筑伤害': '',
-                        '治疗值': '',
-                        '承受伤害': '',
-                        '重伤': '',
-                        '青灯焚骨': '',
-                        '化羽': '',
-                        '控制': ''
-                    }])
-                    result_list.append(empty_row)
-                
-                # 添加标题行
-                title_row = pd.DataFrame([{
-                    '帮会名': '帮会名',
-                    '玩家': '玩家',
-                    '等级': '等级',
-                    '职业': '职业',
-                    '所在团长': '所在团长',
-                    '击败': '击败',
-                    '助攻': '助攻',
-                    '战备资源': '战备资源',
-                    '对玩家伤害': '对玩家伤害',
-                    '对建筑伤害': '对建筑伤害',
-                    '治疗值': '治疗值',
-                    '承受伤害': '承受伤害',
-                    '重伤': '重伤',
-                    '青灯焚骨': '青灯焚骨',
-                    '化羽': '化羽',
-                    '控制': '控制'
-                }])
-                result_list.append(title_row)
-                current_profession = row['职业']
-            
-            # 添加数据行（移除排序键列）
-            data_row = row.drop('sort_key')
-            result_list.append(pd.DataFrame([data_row]))
-        
-        return pd.concat(result_list, ignore_index=True)
+        return sorted_df.drop('sort_key', axis=1)
+    
+    def sort_by_leader(self, df, layout='classic'):
+        """按团长排序，添加分割线"""
+        return self.leader_sheet(self.sort_leader_frame(df), layout)
+    
+    def sort_by_profession(self, df, layout='classic'):
+        """按职业排序，添加分割线"""
+        return self.profession_sheet(self.sort_profession_frame(df), layout)
+    
+    def leader_sheet(self, sorted_df, layout='classic'):
+        """由已按团长排序的数据生成团长排序表"""
+        return self.sorting_sheet(sorted_df, '所在团长', layout)
+    
+    def profession_sheet(self, sorted_df, layout='classic'):
+        """由已按职业排序的数据生成职业排序表"""
+        return self.sorting_sheet(sorted_df, '职业', layout)
+    
+    def sorting_sheet(self, sorted_df, group_column, layout='classic'):
+        """生成排序表：classic 布局在分组之间插入空行和列标题行，outline 布局为连续的数据块"""
+        if layout == 'outline':
+            group_count = len(self.group_boundaries(sorted_df, group_column)[1])
+            header_rows = np.empty((group_count, 0, len(sorted_df.columns)), dtype=object)
+            return self.insert_group_separators(sorted_df, group_column, header_rows, separate_groups=False)
+        return self.insert_group_separators(sorted_df, group_column)
+    
+    def build_master_frame(self):
+        """将各帮会数据合并为一个总数据框，帮会名列区分所属帮会"""
+        # 各帮会的分类取值不同，合并后重新转换为紧凑类型
+        return compact_dtypes(pd.concat(self.guild_dfs, ignore_index=True))
+    
+    def split_by_guild(self, sorted_df):
+        """按帮会拆分已排序的总数据框，各帮会内保持排序后的顺序"""
+        positions = sorted_df.groupby('帮会名', sort=False, observed=True).indices
+        return {name: sorted_df.iloc[positions[name]] if name in positions else sorted_df.iloc[:0]
+                for name in self.guild_names}
     
     def create_statistics(self, df, guild_name):
         """创建统计数据"""
-        stats = {
-            '帮会名': guild_name,
-            '总人数': len(df),
-            '总击败数': df['击败'].sum(),
-            '总助攻数': df['助攻'].sum(),
-            '总战备资源': df['战备资源'].sum(),
-            '总对玩家伤害': df['对玩家伤害'].sum(),
-            '总对建筑伤害': df['对建筑伤害'].sum(),
-            '总治疗值': df['治疗值'].sum(),
-            '总承受伤害': df['承受伤害'].sum(),
-            '总重伤数': df['重伤'].sum(),
-            '总青灯焚骨': df['青灯焚骨'].sum(),
-            '总化羽数': df['化羽'].sum(),
-            '总控制数': df['控制'].sum(),
-        }
+        stats = {'帮会名': guild_name, '总人数': len(df)}
+        for stat_name, col in GUILD_STAT_COLUMNS.items():
+            stats[stat_name] = df[col].sum()
+        
+        return stats
+    
+    def create_block_statistics(self, block, guild_name):
+        """直接由数据块的列数据计算统计数据，只使用标准库，结果与 create_statistics 相同"""
+        stats = {'帮会名': guild_name, '总人数': self.block_row_count(block)}
+        for stat_name, col in GUILD_STAT_COLUMNS.items():
+            stats[stat_name] = sum(map(parse_number, block[col]))
         
         return stats
     
-    def create_profession_statistics(self, df):
+    def quick_summary(self):
+        """快速汇总：只读取CSV并计算各帮会的统计数据，不导入 pandas，也不生成文件"""
+        if not self.read_csv_data():
+            return False
+        self.guild_stats = [self.create_block_statistics(block, name) for block, name in zip(self.guild_blocks, self.guild_names)]
+        self.guild_blocks = []
+        return True
+    
+    def create_group_statistics(self, sorted_df, group_column, include_player_summary=False, layout='classic'):
+        """一次 groupby 计算所有分组的统计数据，生成 标题行、统计行、列标题行 + 详细数据 的分组表
+        
+        outline 布局每个分组前只保留统计行，分组之间不空行
+        """
+        columns = list(sorted_df.columns)
+        counts, sums, means = self.group_aggregates(sorted_df, group_column)
+        
+        # 每个分组前插入三行：标题行、统计行、列标题行
+        header_rows = np.full((len(counts), 3, len(columns)), '', dtype=object)
+        header_rows[:, 2, :] = columns
+        group_idx = columns.index(group_column)
+        
+        for g, group in enumerate(counts.index):
+            title_row = header_rows[g, 0]
+            stats_row = header_rows[g, 1]
+            title_row[group_idx] = f'=== {group} ==='
+            stats_row[group_idx] = f'{group}统计'
+            if include_player_summary:
+                stats_row[columns.index('玩家')] = f'人数: {counts.iat[g]}'
+                stats_row[columns.index('等级')] = f'平均: {means.at[group, "等级"]:.1f}'
+            for col, stat_format in GROUP_STAT_FORMATS.items():
+                stats_row[columns.index(col)] = stat_format.format(total=sums.at[group, col], mean=means.at[group, col])
+        
+        if layout == 'outline':
+            return self.insert_group_separators(sorted_df, group_column, header_rows[:, 1:2], separate_groups=False)
+        return self.insert_group_separators(sorted_df, group_column, header_rows)
+    
+    def group_aggregates(self, df, group_column):
+        """一次 groupby 计算各分组的人数、数值列总计和平均值"""
+        grouped = df.groupby(group_column, sort=True, observed=True)
+        return grouped.size(), grouped[NUMERIC_COLUMNS].sum(), grouped[NUMERIC_COLUMNS].mean()
+    
+    def group_summary(self, df, group_column):
+        """各分组的汇总表（每组一行），用于机器可读的导出格式"""
+        counts, sums, means = self.group_aggregates(df, group_column)
+        summary = {group_column: counts.index.astype(str), '人数': counts.to_numpy(), '平均等级': means['等级'].to_numpy()}
+        for col in GROUP_STAT_FORMATS:
+            summary[f'{col}总计'] = sums[col].to_numpy()
+            summary[f'{col}平均'] = means[col].to_numpy()
+        return pd.DataFrame(summary)
+    
+    def create_profession_statistics(self, df, layout='classic'):
         """创建职业统计数据，按职业分别显示"""
-        profession_stats_list = []
-        for profession in sorted(df['职业'].unique()):
-            profession_data = df[df['职业'] == profession]
+        # 详细数据 - 显示所有玩家的完整数据（按各职业的排序指标排序）
+        return self.profession_statistics_sheet(self.sort_profession_frame(df), layout)
+    
+    def create_leader_statistics(self, df, layout='classic'):
+        """创建团长统计数据，按团长分别显示"""
+        # 详细数据 - 显示所有玩家的完整数据（按对玩家伤害排序）
+        return self.leader_statistics_sheet(self.sort_leader_frame(df), layout)
+    
+    def profession_statistics_sheet(self, sorted_df, layout='classic'):
+        """由已按职业排序的数据生成职业统计表"""
+        return self.create_group_statistics(sorted_df, '职业', include_player_summary=True, layout=layout)
+    
+    def leader_statistics_sheet(self, sorted_df, layout='classic'):
+        """由已按团长排序的数据生成团长统计表"""
+        return self.create_group_statistics(sorted_df, '所在团长', layout=layout)
+    
+    def load_match_data(self):
+        """准备各帮会的数据框和统计数据，启用缓存且CSV内容未变时直接从缓存读取"""
+        if self.guilds:
+            return self.load_selected_guilds()
+        
+        cache_key = None
+        if self.cache is not None:
+            try:
+                cache_key = file_content_hash(self.csv_file_path)
+            except OSError as e:
+                print(f"读取CSV文件时出错：{e}")
+                return False
             
-            # 对职业数据进行排序（按治疗值排序素问，按青灯焚骨排序九灵，其他按对玩家伤害排序）
-            def get_sort_key(row):
-                if profession == '素问':
-                    return row['治疗值']
-                elif profession == '九灵':
-                    return row['青灯焚骨']
+            with self.profile_stage('cache_get'):
+                entry = self.cache.get(cache_key)
+            if entry is not None:
+                self.guild_names = entry['guild_names']
+                self.guild_dfs = entry['guild_dfs']
+                self.guild_stats = entry['guild_stats']
+                print(f"从缓存读取数据：")
+                for i, (name, df) in enumerate(zip(self.guild_names, self.guild_dfs), 1):
+                    print(f"帮会{i}：{name}，数据行数：{len(df)}")
+                return True
+        
+        with self.profile_stage('read_csv_data'):
+            if not self.read_csv_data():
+                return False
+        
+        # 创建数据框和统计数据，之后不再需要原始列数据
+        with self.profile_stage('create_dataframe'):
+            self.guild_dfs = [self.create_dataframe(block, name) for block, name in zip(self.guild_blocks, self.guild_names)]
+        with self.profile_stage('create_statistics'):
+            self.guild_stats = [self.create_statistics(df, name) for df, name in zip(self.guild_dfs, self.guild_names)]
+        self.guild_blocks = []
+        
+        if self.cache is not None:
+            try:
+                with self.profile_stage('cache_put'):
+                    self.cache.put(cache_key, {
+                        'guild_names': self.guild_names,
+                        'guild_dfs': self.guild_dfs,
+                        'guild_stats': self.guild_stats,
+                    })
+            except OSError as e:
+                print(f"警告：写入缓存失败：{e}")
+        return True
+    
+    def load_selected_guilds(self):
+        """只读取指定帮会的数据：通过帮会数据块索引直接定位并解析这些数据块，耗时只与这些帮会的数据量有关
+        
+        只读取部分数据，因此不使用解析结果缓存；文件中没有空行分隔符时读取整个文件后再筛选
+        """
+        try:
+            with self.profile_stage('block_index'):
+                blocks = CsvBlockIndex(self.csv_file_path).load()
+        except (OSError, ValueError) as e:
+            print(f"读取CSV文件时出错：{e}")
+            return False
+        
+        if blocks is None:
+            print("警告：未找到空行分隔符，无法建立帮会索引，改为读取整个文件")
+            with self.profile_stage('read_csv_data'):
+                if not self.read_csv_data():
+                    return False
+            blocks = [{'name': name, 'block': block} for name, block in zip(self.guild_names, self.guild_blocks)]
+            self.guild_blocks = []
+        
+        available = [block['name'] for block in blocks]
+        missing = [name for name in self.guilds if name not in available]
+        if missing:
+            print(f"错误：文件中没有帮会 {'、'.join(missing)}，可选的帮会：{'、'.join(available)}")
+            return False
+        
+        selected = [block for block in blocks if block['name'] in self.guilds]
+        self.guild_names = [block['name'] for block in selected]
+        self.guild_dfs = []
+        for block in selected:
+            with self.profile_stage('read_guild_block', block['name']):
+                if 'block' in block:
+                    df = self.create_dataframe(block['block'], block['name'])
                 else:
-                    return row['对玩家伤害']
-            
-            profession_data_sorted = profession_data.copy()
-            profession_data_sorted['sort_key'] = profession_data_sorted.apply(get_sort_key, axis=1)
-            profession_data_sorted = profession_data_sorted.sort_values('sort_key', ascending=False)
-            profession_data_sorted = profession_data_sorted.drop('sort_key', axis=1)
-            
-            # 添加职业标题行
-            title_row = pd.DataFrame([{col: '' for col in df.columns}])
-            title_row.iloc[0, df.columns.get_loc('职业')] = f'=== {profession} ==='
-            # 添加该职业的统计数据
-            stats_row = pd.DataFrame([{col: '' for col in df.columns}])
-            stats_row.iloc[0, df.columns.get_loc('职业')] = f'{profession}统计'
-            stats_row.iloc[0, df.columns.get_loc('玩家')] = f'人数: {len(profession_data)}'
-            stats_row.iloc[0, df.columns.get_loc('等级')] = f'平均: {profession_data["等级"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('击败')] = f'总计: {profession_data["击败"].sum()}, 平均: {profession_data["击败"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('助攻')] = f'总计: {profession_data["助攻"].sum()}, 平均: {profession_data["助攻"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('战备资源')] = f'总计: {profession_data["战备资源"].sum()}'
-            stats_row.iloc[0, df.columns.get_loc('对玩家伤害')] = f'总计: {profession_data["对玩家伤害"].sum():,.0f}, 平均: {profession_data["对玩家伤害"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('对建筑伤害')] = f'总计: {profession_data["对建筑伤害"].sum():,.0f}, 平均: {profession_data["对建筑伤害"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('治疗值')] = f'总计: {profession_data["治疗值"].sum():,.0f}, 平均: {profession_data["治疗值"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('承受伤害')] = f'总计: {profession_data["承受伤害"].sum():,.0f}, 平均: {profession_data["承受伤害"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('重伤')] = f'总计: {profession_data["重伤"].sum()}, 平均: {profession_data["重伤"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('青灯焚骨')] = f'总计: {profession_data["青灯焚骨"].sum()}, 平均: {profession_data["青灯焚骨"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('化羽')] = f'总计: {profession_data["化羽"].sum()}, 平均: {profession_data["化羽"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('控制')] = f'总计: {profession_data["控制"].sum()}, 平均: {profession_data["控制"].mean():.1f}'
-            # 添加列标题行
-            header_row = pd.DataFrame([{col: col for col in df.columns}])
-            # 详细数据 - 显示所有玩家的完整数据（已排序）
-            detail = profession_data_sorted.copy()
-            profession_stats_list.extend([title_row, stats_row, header_row, detail])
-            # 添加空行作为间隔
-            if profession != sorted(df['职业'].unique())[-1]:
-                empty_row = pd.DataFrame([{col: '' for col in df.columns}])
-                profession_stats_list.append(empty_row)
-        return pd.concat(profession_stats_list, ignore_index=True)
-
-    def create_leader_statistics(self, df):
-        """创建团长统计数据，按团长分别显示"""
-        leader_stats_list = []
-        for leader in sorted(df['所在团长'].unique()):
-            leader_data = df[df['所在团长'] == leader]
+                    df = self.read_block_frame(block['start'], block['end'], block['name'])
+            self.guild_dfs.append(df)
+        with self.profile_stage('create_statistics'):
+            self.guild_stats = [self.create_statistics(df, name) for df, name in zip(self.guild_dfs, self.guild_names)]
+        
+        print(f"成功读取数据：")
+        for i, (name, df) in enumerate(zip(self.guild_names, self.guild_dfs), 1):
+            print(f"帮会{i}：{name}，数据行数：{len(df)}")
+        return True
+    
+    def read_block_frame(self, start, end, guild_name):
+        """读取并解析CSV文件中 [start, end) 字节范围内的一个帮会数据块，结果与 create_dataframe 相同
+        
+        使用 pandas 的C引擎解析；各行列数不一致等C引擎无法处理的情况改用 csv 模块逐行解析
+        """
+        with open(self.csv_file_path, 'rb') as file:
+            file.seek(start)
+            data = file.read(end - start)
+        
+        # 文本列按原样读取；数值列由C引擎直接解析，空值视为缺失，含无法解析的值时再逐列转换
+        text_columns = {COLUMNS.index(col): str for col in COLUMNS if col not in NUMERIC_COLUMNS}
+        empty_values = {COLUMNS.index(col): [''] for col in NUMERIC_COLUMNS}
+        try:
+            df = pd.read_csv(io.BytesIO(data), header=None, dtype=text_columns, keep_default_na=False, na_values=empty_values,
+                             encoding='utf-8', engine='c')
+        except pd.errors.ParserError:
+            block = self.new_block_columns()
+            for row in csv.reader(io.StringIO(data.decode('utf-8'))):
+                if row and any(cell.strip() for cell in row) and row[0].strip() != '帮会名':
+                    self.append_row(block, row)
+            return self.create_dataframe(block, guild_name)
+        
+        # 与 append_row 相同：多余的列忽略，缺少的列为空
+        df = df.iloc[:, :len(COLUMNS)]
+        for col_idx in range(df.shape[1], len(COLUMNS)):
+            df[col_idx] = None
+        df.columns = COLUMNS
+        text_columns = [col for col in COLUMNS if col not in NUMERIC_COLUMNS]
+        df[text_columns] = df[text_columns].fillna('')
+        
+        # 过滤只含空白和逗号的行以及重复的标题行；只有帮会名为空的行才需要检查其余各列是否也为空
+        # 已解析为数值的列中空单元格为缺失值，其余列按去除空白后是否为空判断
+        guild_cells = df['帮会名'].str.strip()
+        is_blank = guild_cells == ''
+        if is_blank.any():
+            is_blank[is_blank] = df[is_blank].apply(
+                lambda column: column.isna() | (column.astype(str).str.strip() == '')
+            ).all(axis=1)
+        df = df[~is_blank & (guild_cells != '帮会名')].reset_index(drop=True)
+        
+        for col in NUMERIC_COLUMNS:
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df[col] = df[col].fillna(0)
+        df['帮会名'] = guild_name
+        return compact_dtypes(df)
+    
+    def prepare_sorted_views(self):
+        """返回 (综合职业排序数据, 各帮会团长排序数据, 各帮会职业排序数据)"""
+        # 合并为一个总数据框，按团长和按职业各排序一次，各帮会的表取排序结果中该帮会的部分
+        # （稳定排序，各帮会内的顺序与单独排序时一致）
+        with self.profile_stage('build_master_frame'):
+            master_df = self.build_master_frame()
+        with self.profile_stage('sort_leader_frame'):
+            leader_sorted = self.sort_leader_frame(master_df)
+        with self.profile_stage('sort_profession_frame'):
+            profession_sorted = self.sort_profession_frame(master_df)
+        with self.profile_stage('split_by_guild'):
+            leader_views = self.split_by_guild(leader_sorted)
+            profession_views = self.split_by_guild(profession_sorted)
+        with self.profile_stage('compute_group_best'):
+            self.group_best = self.compute_group_best(master_df)
+        return profession_sorted, leader_views, profession_views
+    
+    def compute_group_best(self, master_df):
+        """各排名范围内每个分组各指标的最高值（即排名第一的值），数据条直接使用，不再扫描工作表内容"""
+        return {
+            scope: master_df.groupby(keys, sort=False, observed=True)[RANK_METRIC_COLUMNS].max()
+            for scope, keys in RANK_SCOPES.items() if keys
+        }
+    
+    def compute_rankings(self, master_df):
+        """对总数据框一次性向量化计算每个玩家在各排名范围内每个指标的名次和百分位
+        
+        返回与总数据框逐行对应的排名表：玩家标识列，以及每个指标每个范围的「排名」（并列取最好名次）和
+        「百分位」（该范围内不高于该玩家的人数占比，最高者为100）。排名表很宽，只在导出玩家排名数据集时计算
+        """
+        ranks = {}
+        percentiles = {}
+        for scope, keys in RANK_SCOPES.items():
+            if keys:
+                grouped = master_df.groupby(keys, sort=False, observed=True)[RANK_METRIC_COLUMNS]
+            else:
+                grouped = master_df[RANK_METRIC_COLUMNS]
+            ranks[scope] = grouped.rank(method='min', ascending=False)
+            percentiles[scope] = grouped.rank(method='max', pct=True)
+        
+        rankings = {col: master_df[col] for col in RANKING_ID_COLUMNS}
+        for col in RANK_METRIC_COLUMNS:
+            for scope in RANK_SCOPES:
+                rankings[f'{col}{scope}排名'] = ranks[scope][col].astype('int32')
+                rankings[f'{col}{scope}百分位'] = (percentiles[scope][col] * 100).round(1)
+        return pd.DataFrame(rankings)
+    
+    def create_excel_file(self, output_file, write_only=False, layout='classic'):
+        """创建Excel文件，write_only为True时使用流式写入模式，每行写入后即释放"""
+        from openpyxl import Workbook
+        
+        wb = Workbook(write_only=write_only)
+        
+        # 删除默认工作表（流式写入模式下没有默认工作表）
+        if not write_only:
+            wb.remove(wb.active)
+        
+        with self.dataset_executor() as executor:
+            # 各数据集在后台计算，写入时按工作表顺序取用已完成的数据集
+            sheets = self.iter_sheet_datasets(executor, layout)
             
-            # 对团长数据进行排序（按对玩家伤害排序）
-            leader_data_sorted = leader_data.sort_values('对玩家伤害', ascending=False)
+            # 首先创建广告页面
+            ws_ad = wb.create_sheet(title="关于程序", index=0)
+            with self.profile_stage('create_advertisement_page', "关于程序"):
+                self.create_advertisement_page(ws_ad)
             
-            # 添加团长标题行
-            title_row = pd.DataFrame([{col: '' for col in df.columns}])
-            title_row.iloc[0, df.columns.get_loc('所在团长')] = f'=== {leader} ==='
-            # 添加该团长的统计数据
-            stats_row = pd.DataFrame([{col: '' for col in df.columns}])
-            stats_row.iloc[0, df.columns.get_loc('所在团长')] = f'{leader}统计'
-            stats_row.iloc[0, df.columns.get_loc('击败')] = f'总计: {leader_data["击败"].sum()}, 平均: {leader_data["击败"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('助攻')] = f'总计: {leader_data["助攻"].sum()}, 平均: {leader_data["助攻"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('战备资源')] = f'总计: {leader_data["战备资源"].sum()}'
-            stats_row.iloc[0, df.columns.get_loc('对玩家伤害')] = f'总计: {leader_data["对玩家伤害"].sum():,.0f}, 平均: {leader_data["对玩家伤害"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('对建筑伤害')] = f'总计: {leader_data["对建筑伤害"].sum():,.0f}, 平均: {leader_data["对建筑伤害"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('治疗值')] = f'总计: {leader_data["治疗值"].sum():,.0f}, 平均: {leader_data["治疗值"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('承受伤害')] = f'总计: {leader_data["承受伤害"].sum():,.0f}, 平均: {leader_data["承受伤害"].mean():,.0f}'
-            stats_row.iloc[0, df.columns.get_loc('重伤')] = f'总计: {leader_data["重伤"].sum()}, 平均: {leader_data["重伤"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('青灯焚骨')] = f'总计: {leader_data["青灯焚骨"].sum()}, 平均: {leader_data["青灯焚骨"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('化羽')] = f'总计: {leader_data["化羽"].sum()}, 平均: {leader_data["化羽"].mean():.1f}'
-            stats_row.iloc[0, df.columns.get_loc('控制')] = f'总计: {leader_data["控制"].sum()}, 平均: {leader_data["控制"].mean():.1f}'
-            # 添加列标题行
-            header_row = pd.DataFrame([{col: col for col in df.columns}])
-            # 详细数据 - 显示所有玩家的完整数据（已排序）
-            detail = leader_data_sorted.copy()
-            leader_stats_list.extend([title_row, stats_row, header_row, detail])
-            # 添加空行作为间隔
-            if leader != sorted(df['所在团长'].unique())[-1]:
-                empty_row = pd.DataFrame([{col: '' for col in df.columns}])
-                leader_stats_list.append(empty_row)
-        return pd.concat(leader_stats_list, ignore_index=True)
-    
-    def create_excel_file(self, output_file):
-        """创建Excel文件"""
-        wb = Workbook()
-        
-        # 删除默认工作表
-        wb.remove(wb.active)
-        
-        # 创建数据框
-        guild1_df = self.create_dataframe(self.guild1_data, self.guild1_name)
-        guild2_df = self.create_dataframe(self.guild2_data, self.guild2_name)
-        
-        # 合并数据用于综合职业排序
-        combined_df = pd.concat([guild1_df, guild2_df], ignore_index=True)
-        
-        # 创建统计数据
-        stats1 = self.create_statistics(guild1_df, self.guild1_name)
-        stats2 = self.create_statistics(guild2_df, self.guild2_name)
-        
-        # 创建职业和团长统计
-        prof_stats1 = self.create_profession_statistics(guild1_df)
-        prof_stats2 = self.create_profession_statistics(guild2_df)
-        leader_stats1 = self.create_leader_statistics(guild1_df)
-        leader_stats2 = self.create_leader_statistics(guild2_df)
-        
-        # 首先创建广告页面
-        ws_ad = wb.create_sheet(title="关于程序", index=0)
-        self.create_advertisement_page(ws_ad)
-        
-        # 创建工作表
-        sheets = [
-            (f"{self.guild1_name}团长排序", self.sort_by_leader(guild1_df)),
-            (f"{self.guild1_name}职业排序", self.sort_by_profession(guild1_df)),
-            (f"{self.guild2_name}团长排序", self.sort_by_leader(guild2_df)),
-            (f"{self.guild2_name}职业排序", self.sort_by_profession(guild2_df)),
-            ("综合职业排序", self.sort_by_profession(combined_df)),
-            (f"{self.guild1_name}职业统计", prof_stats1),
-            (f"{self.guild1_name}团长统计", leader_stats1),
-            (f"{self.guild2_name}职业统计", prof_stats2),
-            (f"{self.guild2_name}团长统计", leader_stats2),
-            ("帮会对比", pd.DataFrame([stats1, stats2]))
-        ]
-        
-        for sheet_name, df in sheets:
-            ws = wb.create_sheet(title=sheet_name)
-            self.format_worksheet(ws, df, sheet_name)
+            for sheet_name, df, data_bars, outline_levels in sheets:
+                ws = wb.create_sheet(title=sheet_name)
+                with self.profile_stage('format_worksheet', sheet_name):
+                    self.format_worksheet(ws, df, sheet_name, data_bars, outline_levels, self.profiler)
+                if self.profiler is not None:
+                    rules = sum(len(cf.rules) for cf in ws.conditional_formatting)
+                    self.profiler.record_sheet(sheet_name, len(df) + 1, len(df.columns), rules)
         
         # 保存文件
+        with self.profile_stage('save_workbook'):
+            wb.save(output_file)
+        print(f"Excel文件已保存：{output_file}")
+    
+    @classmethod
+    def create_datasets_workbook(cls, output_file, datasets):
+        """将 [(工作表名, 数据框)] 以流式写入模式写成Excel文件，首页为关于程序页面，样式与报表一致（不含数据条）"""
+        from openpyxl import Workbook
+        
+        wb = Workbook(write_only=True)
+        cls.create_advertisement_page(wb.create_sheet(title="关于程序"))
+        for sheet_name, df in datasets:
+            cls.format_worksheet(wb.create_sheet(title=sheet_name), df, sheet_name)
         wb.save(output_file)
         print(f"Excel文件已保存：{output_file}")
     
-    def create_advertisement_page(self, ws):
-        """创建广告页面"""
-        # 设置列宽
-        ws.column_dimensions['A'].width = 20
-        ws.column_dimensions['B'].width = 60
-        ws.column_dimensions['C'].width = 20
+    def dataset_executor(self):
+        """计算数据集的线程池；只有一个线程或开启性能分析（按阶段测量需要顺序执行）时不使用线程池"""
+        if self.dataset_workers <= 1 or self.profiler is not None:
+            return nullcontext()
+        return ThreadPoolExecutor(max_workers=self.dataset_workers)
+    
+    def build_sheet_datasets(self, layout='classic'):
+        """生成各数据工作表的内容，返回 [(工作表名, 数据框, 数据条规则, 分级显示级别)]，顺序与工作表顺序一致"""
+        with self.dataset_executor() as executor:
+            return list(self.iter_sheet_datasets(executor, layout))
+    
+    def iter_sheet_datasets(self, executor=None, layout='classic'):
+        """按工作表顺序逐个产出 (工作表名, 数据框, 数据条规则, 分级显示级别)
         
-        # 标题样式
-        title_font = Font(bold=True, size=16, color="FFFFFF")
-        title_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        title_alignment = Alignment(horizontal="center", vertical="center")
+        分级显示级别为 outline 布局中各数据行的级别（classic 布局为 None）。
         
-        # 副标题样式
-        subtitle_font = Font(bold=True, size=14, color="FFFFFF")
-        subtitle_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        subtitle_alignment = Alignment(horizontal="center", vertical="center")
+        提供线程池时，最多提前计算 dataset_workers 个数据集，产出时按顺序等待各自的结果，
+        调用方写入前面的工作表时后面的数据集仍在计算，同时在内存中的数据集数量有上限；否则在产出时依次计算。
+        """
+        profession_sorted, leader_views, profession_views = self.prepare_sorted_views()
         
-        # 正文样式
-        content_font = Font(size=11)
-        content_alignment = Alignment(horizontal="left", vertical="top", wrap_text=True)
+        # 创建工作表：各帮会的排序表、综合职业排序、各帮会的职业和团长统计、帮会对比
+        # 每项为 (工作表名, 生成函数, 排序数据, 数据条使用的排名范围)
+        sheet_builders = []
+        for name in self.guild_names:
+            sheet_builders.append((f"{name}团长排序", self.leader_sheet, leader_views[name], '团长'))
+            sheet_builders.append((f"{name}职业排序", self.profession_sheet, profession_views[name], '职业'))
+        sheet_builders.append(("综合职业排序", self.profession_sheet, profession_sorted, '综合职业'))
+        for name in self.guild_names:
+            sheet_builders.append((f"{name}职业统计", self.profession_statistics_sheet, profession_views[name], '职业'))
+            sheet_builders.append((f"{name}团长统计", self.leader_statistics_sheet, leader_views[name], '团长'))
+        sheet_builders.append(("帮会对比", self.create_guild_comparison, self.guild_stats, None))
         
-        # 链接样式
-        link_font = Font(size=11, color="0000FF", underline="single")
+        if executor is None:
+            return self.build_datasets_in_order(sheet_builders, layout)
         
-        # 边框样式
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        return self.build_datasets_ahead(executor, sheet_builders, layout)
+    
+    def build_sheet_dataset(self, sheet_name, builder, data, scope, layout='classic'):
+        """计算一个工作表的 (数据框, 数据条规则, 分级显示级别)；帮会对比表（scope 为 None）不分组"""
+        if scope is None:
+            with self.profile_stage(builder.__name__, sheet_name):
+                return builder(data), [], None
         
-        # 添加内容
-        content_data = [
-            # 标题
-            ("", "帮会联赛数据处理程序 - 高级版", ""),
-            ("", "", ""),
-            
-            # 程序信息
-            ("", "程序信息", ""),
-            ("版本", "高级版 V2.0", ""),
-            ("作者", "VexMare（恶小梦）", ""),
-            ("更新时间", "2025.7.30", ""),
-            ("", "", ""),
-            
-            # 联系方式
-            ("", "联系方式", ""),
-            ("GitHub", "https://github.com/VexMare/NSH_GangWarStats", ""),
-            ("BiliBili", "https://space.bilibili.com/365374856?spm_id_from=333.1007.0.0", ""),
-            ("邮箱", "chixiaotao@foxmail.com", ""),
-            ("", "", ""),
-            
-            # 功能特色
-            ("", "功能特色", ""),
-            ("", "• 智能数据排序：按团长、职业等多种方式排序", ""),
-            ("", "• 颜色可视化：不同数据用不同颜色突出显示", ""),
-            ("", "• 详细统计：包含总计、平均值等统计信息", ""),
-            ("", "• 多工作表：10个不同视角的数据分析", ""),
-            ("", "• 职业特定排序：素问按治疗值，九灵按青灯焚骨", ""),
-            ("", "", ""),
-            
-            # 使用说明
-            ("", "使用说明", ""),
-            ("", "1. 准备CSV文件，确保格式正确（UTF-8编码）", ""),
-            ("", "2. 运行程序，选择CSV文件", ""),
-            ("", "3. 程序自动生成Excel文件，包含10个工作表", ""),
-            ("", "4. 查看不同角度的数据分析结果", ""),
-            ("", "", ""),
-            
-            # 版权声明
-            ("", "版权声明", ""),
-            ("", "本程序采用 MIT 许可证", ""),
-            ("", "", ""),
-            ("", "MIT License", ""),
-            ("", "Copyright (c) 2024 VexMare", ""),
-            ("", "", ""),
-            ("", "Permission is hereby granted, free of charge, to any person obtaining a copy", ""),
-            ("", "of this software and associated documentation files (the \"Software\"), to deal", ""),
-            ("", "in the Software without restriction, including without limitation the rights", ""),
-            ("", "to use, copy, modify, merge, publish, distribute, sublicense, and/or sell", ""),
-            ("", "copies of the Software, and to permit persons to whom the Software is", ""),
-            ("", "furnished to do so, subject to the following conditions:", ""),
-            ("", "", ""),
-            ("", "The above copyright notice and this permission notice shall be included in all", ""),
-            ("", "copies or substantial portions of the Software.", ""),
-            ("", "", ""),
-            ("", "THE SOFTWARE IS PROVIDED \"AS IS\", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR", ""),
-            ("", "IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,", ""),
-            ("", "FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE", ""),
-            ("", "AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER", ""),
-            ("", "LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,", ""),
-            ("", "OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE", ""),
-            ("", "SOFTWARE.", ""),
-            ("", "", ""),
-            
-            # 重要声明
-            ("", "重要声明", ""),
-            ("", "⚠️  禁止商用：本程序仅供学习和个人使用，禁止用于商业用途", ""),
-            ("", "⚠️  免责声明：使用本程序产生的任何后果由用户自行承担", ""),
-            ("", "⚠️  技术支持：如有问题，请通过上述联系方式联系作者", ""),
-            ("", "", ""),
-            
-            # 未来计划
-            ("", "未来计划", ""),
-            ("", "我们即将推出收费版网站服务，提供更便捷的在线数据处理功能。", ""),
-            ("", "如果您有相关开发经验，欢迎加入我们的团队！", ""),
-            ("", "请将您的GitHub链接发送到邮箱：chixiaotao@foxmail.com", ""),
-        ]
+        with self.profile_stage(builder.__name__, sheet_name):
+            df = builder(data, layout)
+        with self.profile_stage('data_bar_rules', sheet_name):
+            data_bars = self.data_bar_rules(sheet_name, data, scope, layout)
+        outline_levels = None
+        if layout == 'outline':
+            with self.profile_stage('outline_levels', sheet_name):
+                outline_levels = self.outline_levels(sheet_name, data, RANK_SCOPES[scope][-1])
+        return df, data_bars, outline_levels
+    
+    def build_datasets_in_order(self, sheet_builders, layout='classic'):
+        """依次计算各数据集"""
+        for task in sheet_builders:
+            yield (task[0],) + self.build_sheet_dataset(*task, layout)
+    
+    def build_datasets_ahead(self, executor, sheet_builders, layout='classic'):
+        """在线程池中提前计算后面的数据集，同时在计算或等待写入的数据集不超过 dataset_workers 个，已产出的不再保留"""
+        tasks = iter(sheet_builders)
+        pending = deque()
         
-        # 写入内容并设置样式
-        for row_idx, (col_a, col_b, col_c) in enumerate(content_data, 1):
-            # 写入数据
-            ws.cell(row=row_idx, column=1, value=col_a)
-            ws.cell(row=row_idx, column=2, value=col_b)
-            ws.cell(row=row_idx, column=3, value=col_c)
-            
-            # 设置边框
-            for col in range(1, 4):
-                ws.cell(row=row_idx, column=col).border = border
-            
-            # 根据内容设置样式
+        def submit_next():
+            task = next(tasks, None)
+            if task is not None:
+                pending.append((task[0], executor.submit(self.build_sheet_dataset, *task, layout)))
+        
+        for _ in range(self.dataset_workers):
+            submit_next()
+        while pending:
+            sheet_name, future = pending.popleft()
+            dataset = (sheet_name,) + future.result()
+            del future
+            # 写入这个数据集的同时开始计算下一个
+            submit_next()
+            yield dataset
+            del dataset
+    
+    def create_excel_file_xlsxwriter(self, output_file, layout='classic'):
+        """使用 xlsxwriter 的恒定内存模式创建Excel文件，布局、样式和数据条与 openpyxl 引擎一致"""
+        with self.dataset_executor() as executor:
+            self.write_xlsxwriter_workbook(output_file, self.iter_sheet_datasets(executor, layout))
+        print(f"Excel文件已保存：{output_file}")
+    
+    def write_xlsxwriter_workbook(self, output_file, sheets):
+        """逐行写出关于程序页面和各数据工作表，写出的行不再保留在内存中"""
+        import xlsxwriter
+        
+        # 字符串原样写入，不自动转换为公式、链接或数字
+        wb = xlsxwriter.Workbook(output_file, {
+            'constant_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+            'strings_to_numbers': False,
+        })
+        formats = {name: wb.add_format(self.xlsxwriter_format_properties(spec)) for name, spec in STYLE_SPECS.items()}
+        
+        with self.profile_stage('create_advertisement_page', "关于程序"):
+            ws = wb.add_worksheet("关于程序")
+            for col, width in ABOUT_COLUMN_WIDTHS.items():
+                ws.set_column(f'{col}:{col}', width)
+            border_format = formats[ABOUT_STYLE_NAMES['border']]
+            for row_idx, (col_a, col_b, col_c), style_name, merge, height in self.about_page_layout():
+                row = row_idx - 1
+                ws.set_row(row, height)
+                if merge:
+                    ws.merge_range(row, 0, row, 2, col_b, formats[style_name])
+                else:
+                    ws.write(row, 0, col_a, border_format)
+                    ws.write(row, 1, col_b, formats[style_name])
+                    ws.write(row, 2, col_c, border_format)
+        
+        for sheet_name, df, data_bars, outline_levels in sheets:
+            ws = wb.add_worksheet(sheet_name)
+            with self.profile_stage('format_worksheet', sheet_name):
+                rules = self.format_worksheet_xlsxwriter(ws, formats, df, sheet_name, data_bars, outline_levels)
+            if self.profiler is not None:
+                self.profiler.record_sheet(sheet_name, len(df) + 1, len(df.columns), rules)
+        
+        with self.profile_stage('save_workbook'):
+            wb.close()
+    
+    def xlsxwriter_format_properties(self, spec):
+        """将样式定义转换为 xlsxwriter 的格式属性"""
+        properties = {}
+        if spec.get('bold'):
+            properties['bold'] = True
+        if 'size' in spec:
+            properties['font_size'] = spec['size']
+        if 'color' in spec:
+            properties['font_color'] = '#' + spec['color']
+        if spec.get('underline'):
+            properties['underline'] = 1
+        if 'fill' in spec:
+            properties.update(pattern=1, bg_color='#' + spec['fill'])
+        if spec.get('align') == 'center':
+            properties.update(align='center', valign='vcenter')
+        elif spec.get('align') == 'top_left':
+            properties.update(align='left', valign='top', text_wrap=True)
+        if spec['border']:
+            properties['border'] = 1
+        return properties
+    
+    def format_worksheet_xlsxwriter(self, ws, formats, df, sheet_name, data_bars=(), outline_levels=None):
+        """用 xlsxwriter 写出一个数据工作表并添加数据条，返回数据条规则数"""
+        for col, width in self.column_widths(sheet_name).items():
+            ws.set_column(f'{col}:{col}', width)
+        ws.freeze_panes(1, 0)
+        if outline_levels is not None:
+            # 分级显示的折叠按钮位于分组上方的统计行或第一名所在行；不开启筛选（原因见 SHEET_LAYOUTS）
+            ws.outline_settings(True, False, True, False)
+        
+        for row_idx, row in enumerate(iter_frame_rows(df), 1):
+            values = [self.safe_value(value) for value in row]
+            level = None if outline_levels is None or row_idx == 1 else int(outline_levels[row_idx - 2])
+            if level:
+                ws.set_row(row_idx - 1, None, None, {'level': level})
+            style_name = ROW_STYLE_NAMES[self.get_row_type(sheet_name, row_idx, values, level)]
+            ws.write_row(row_idx - 1, 0, values, formats[style_name])
+        
+        with self.profile_stage('add_damage_color_gradient', sheet_name):
+            for cell_range, max_value, color in data_bars:
+                ws.conditional_format(cell_range.split()[0].split(':')[0], {
+                    'type': 'data_bar',
+                    'bar_color': '#' + color,
+                    'min_type': 'num', 'min_value': 0,
+                    'max_type': 'num', 'max_value': max_value,
+                    'multi_range': cell_range,
+                })
+        return len(data_bars)
+    
+    def create_guild_comparison(self, guild_stats):
+        """创建帮会对比数据"""
+        return pd.DataFrame(guild_stats)
+    
+    def build_export_datasets(self):
+        """生成与Excel工作表对应的机器可读数据集：排序表不含分割行，统计表为每组一行的汇总，最后附加玩家排名表"""
+        profession_sorted, leader_views, profession_views = self.prepare_sorted_views()
+        
+        datasets = []
+        for name in self.guild_names:
+            datasets.append((f"{name}团长排序", leader_views[name]))
+            datasets.append((f"{name}职业排序", profession_views[name]))
+        datasets.append(("综合职业排序", profession_sorted))
+        for name in self.guild_names:
+            with self.profile_stage('group_summary', f"{name}职业统计"):
+                datasets.append((f"{name}职业统计", self.group_summary(profession_views[name], '职业')))
+            with self.profile_stage('group_summary', f"{name}团长统计"):
+                datasets.append((f"{name}团长统计", self.group_summary(leader_views[name], '所在团长')))
+        datasets.append(("帮会对比", self.create_guild_comparison(self.guild_stats)))
+        with self.profile_stage('compute_rankings'):
+            datasets.append(("玩家排名", self.compute_rankings(self.build_master_frame())))
+        return datasets
+    
+    def export_datasets(self, output_dir, output_format):
+        """将各数据集按指定格式导出到目录中，每个数据集一个文件，不使用 openpyxl；缺少可选依赖库时抛出 ImportError"""
+        extension, write_dataset = EXPORT_BACKENDS[output_format]
+        check_output_dependencies(output_format)
+        os.makedirs(output_dir, exist_ok=True)
+        
+        for dataset_name, df in self.build_export_datasets():
+            with self.profile_stage(f'export_{output_format}', dataset_name):
+                write_dataset(df, os.path.join(output_dir, dataset_name + extension))
+            if self.profiler is not None:
+                self.profiler.record_sheet(dataset_name, len(df) + 1, len(df.columns), 0)
+        print(f"{output_format.upper()}数据集已导出：{output_dir}")
+    
+    def get_sheet_names(self):
+        """按顺序返回生成的Excel文件中的所有工作表名"""
+        sheet_names = ["关于程序"]
+        for name in self.guild_names:
+            sheet_names.extend([f"{name}团长排序", f"{name}职业排序"])
+        sheet_names.append("综合职业排序")
+        for name in self.guild_names:
+            sheet_names.extend([f"{name}职业统计", f"{name}团长统计"])
+        sheet_names.append("帮会对比")
+        return sheet_names
+    
+    def get_dataset_names(self):
+        """按顺序返回导出的数据集名（与工作表名相同，不含关于程序页面，另有玩家排名表）"""
+        return self.get_sheet_names()[1:] + ["玩家排名"]
+    
+    @staticmethod
+    def about_page_layout():
+        """关于程序页面的布局：逐行返回 (行号, 三列的值, B列样式名, 是否合并A:C, 行高)，A列和C列只有边框"""
+        for row_idx, (col_a, col_b, col_c) in enumerate(ABOUT_PAGE_CONTENT, 1):
+            # 根据内容确定B列样式、行高以及是否合并单元格
+            style_name = ABOUT_STYLE_NAMES['border']
+            merge = False
+            height = 18
             if "帮会联赛数据处理程序" in str(col_b):
                 # 主标题
-                ws.cell(row=row_idx, column=2).font = title_font
-                ws.cell(row=row_idx, column=2).fill = title_fill
-                ws.cell(row=row_idx, column=2).alignment = title_alignment
-                # 合并单元格
-                ws.merge_cells(f'A{row_idx}:C{row_idx}')
-            elif any(keyword in str(col_b) for keyword in ["程序信息", "联系方式", "功能特色", "使用说明", "版权声明", "重要声明", "未来计划"]):
+                style_name = ABOUT_STYLE_NAMES['title']
+                merge = True
+                height = 30
+            elif any(keyword in str(col_b) for keyword in ABOUT_SUBTITLES):
                 # 副标题
-                ws.cell(row=row_idx, column=2).font = subtitle_font
-                ws.cell(row=row_idx, column=2).fill = subtitle_fill
-                ws.cell(row=row_idx, column=2).alignment = subtitle_alignment
-                # 合并单元格
-                ws.merge_cells(f'A{row_idx}:C{row_idx}')
+                style_name = ABOUT_STYLE_NAMES['subtitle']
+                merge = True
+                height = 25
             elif any(keyword in str(col_b) for keyword in ["https://", "chixiaotao@foxmail.com"]):
                 # 链接
-                ws.cell(row=row_idx, column=2).font = link_font
-                ws.cell(row=row_idx, column=2).alignment = content_alignment
+                style_name = ABOUT_STYLE_NAMES['link']
             elif col_b and col_b != "":
                 # 正文内容
-                ws.cell(row=row_idx, column=2).font = content_font
-                ws.cell(row=row_idx, column=2).alignment = content_alignment
-        
-        # 设置行高
-        for row in range(1, len(content_data) + 1):
-            if "帮会联赛数据处理程序" in str(ws.cell(row=row, column=2).value):
-                ws.row_dimensions[row].height = 30
-            elif any(keyword in str(ws.cell(row=row, column=2).value) for keyword in ["程序信息", "联系方式", "功能特色", "使用说明", "版权声明", "重要声明", "未来计划"]):
-                ws.row_dimensions[row].height = 25
+                style_name = ABOUT_STYLE_NAMES['content']
+            yield row_idx, (col_a, col_b, col_c), style_name, merge, height
+    
+    @classmethod
+    def create_advertisement_page(cls, ws):
+        """创建广告页面"""
+        from openpyxl.cell import WriteOnlyCell
+        
+        # 设置列宽
+        for col, width in ABOUT_COLUMN_WIDTHS.items():
+            ws.column_dimensions[col].width = width
+        
+        # 样式统一使用工作簿中注册的命名样式
+        cls.register_named_styles(ws.parent)
+        write_only = ws.parent.write_only
+        
+        # 写入内容并设置样式
+        for row_idx, values, style_name, merge, height in cls.about_page_layout():
+            # 设置行高（流式写入模式下需在写入该行之前设置）
+            ws.row_dimensions[row_idx].height = height
+            
+            styles = (ABOUT_STYLE_NAMES['border'], style_name, ABOUT_STYLE_NAMES['border'])
+            if write_only:
+                cells = []
+                for value, cell_style in zip(values, styles):
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.style = cell_style
+                    cells.append(cell)
+                ws.append(cells)
             else:
-                ws.row_dimensions[row].height = 18
+                for col_idx, (value, cell_style) in enumerate(zip(values, styles), 1):
+                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
+                    cell.style = cell_style
+            
+            if merge:
+                # 合并单元格
+                if write_only:
+                    ws.merged_cells.add(f'A{row_idx}:C{row_idx}')
+                else:
+                    ws.merge_cells(f'A{row_idx}:C{row_idx}')
     
-    def format_worksheet(self, ws, df, sheet_name):
-        """格式化工作表"""
+    @classmethod
+    def format_worksheet(cls, ws, df, sheet_name, data_bars=(), outline_levels=None, profiler=None):
+        """格式化工作表，data_bars 为 data_bar_rules 生成的数据条规则，outline_levels 为 outline 布局各数据行的分级显示级别
+        
+        提供 profiler（StageProfiler）时，添加数据条单独记为 add_damage_color_gradient 阶段
+        """
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils.dataframe import dataframe_to_rows
+        from openpyxl.worksheet.properties import Outline
+        
         # 设置列宽
-        column_widths = {
-            'A': 12, 'B': 14, 'C': 8, 'D': 10, 'E': 14, 'F': 12, 'G': 12, 'H': 14, 'I': 14, 'J': 14, 'K': 14, 'L': 14, 'M': 14, 'N': 14, 'O': 14, 'P': 14
-        }
-        # 针对统计表，设置指定列宽为24
+        for col, width in cls.column_widths(sheet_name).items():
+            ws.column_dimensions[col].width = width
+        
+        # 冻结首行（流式写入模式下必须在写入数据之前设置）
+        ws.freeze_panes = "A2"
+        
+        if outline_levels is not None:
+            # 分级显示的折叠按钮位于分组上方的统计行或第一名所在行；不开启筛选（原因见 SHEET_LAYOUTS）
+            ws.sheet_properties.outlinePr = Outline(summaryBelow=False)
+            ws.sheet_format.outlineLevelRow = int(outline_levels.max(initial=0))
+        
+        cls.register_named_styles(ws.parent)
+        write_only = ws.parent.write_only
+        
+        # 逐行写入数据，使用安全值处理，并按行类型一次性套用命名样式
+        for row_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
+            values = [cls.safe_value(value) for value in row]
+            level = None if outline_levels is None or row_idx == 1 else int(outline_levels[row_idx - 2])
+            if level:
+                ws.row_dimensions[row_idx].outlineLevel = level
+            style_name = ROW_STYLE_NAMES[cls.get_row_type(sheet_name, row_idx, values, level)]
+            
+            if write_only:
+                # 流式写入模式：生成单元格后立即写出，写出后不再保留单元格对象和行属性
+                cells = []
+                for value in values:
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.style = style_name
+                    cells.append(cell)
+                ws.append(cells)
+                if level:
+                    del ws.row_dimensions[row_idx]
+            else:
+                for col_idx, value in enumerate(values, 1):
+                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
+                    cell.style = style_name
+        
+        # 为统计表和排序表添加数据条（基于分组内的最大值）
+        if data_bars:
+            with profiler.stage('add_damage_color_gradient', sheet_name) if profiler is not None else nullcontext():
+                cls.add_damage_color_gradient(ws, data_bars)
+    
+    @staticmethod
+    def column_widths(sheet_name):
+        """工作表的列宽设置，统计表只调整数值列"""
         if any(x in sheet_name for x in ["团长统计", "职业统计"]):
-            for col in ['F', 'G', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P']:
-                ws.column_dimensions[col].width = 27
-        else:
-            for col, width in column_widths.items():
-                ws.column_dimensions[col].width = width
-        
-        # 安全处理值，避免公式问题
-        def safe_value(value):
-            """安全处理值，避免公式问题"""
-            if isinstance(value, str):
-                # 如果字符串以等号开头，添加单引号前缀
-                if value.startswith('='):
-                    return f"'{value}"
-                # 如果字符串包含特殊字符，用引号包围
-                elif any(char in value for char in ['+', '-', '*', '/', '(', ')', '=']):
-                    return f"'{value}"
-            return value
-        
-        # 添加数据，使用安全值处理
-        for row_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True)):
-            for col_idx, value in enumerate(row):
-                cell = ws.cell(row=row_idx + 1, column=col_idx + 1)
-                cell.value = safe_value(value)
-        
-        # 设置标题行样式
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # 设置数据行样式
-        data_alignment = Alignment(horizontal="center", vertical="center")
+            return STATISTICS_COLUMN_WIDTHS
+        return SHEET_COLUMN_WIDTHS
+    
+    @staticmethod
+    def register_named_styles(wb):
+        """在工作簿中注册所有命名样式，每种样式只注册一次，单元格按名称引用"""
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+        from openpyxl.styles.borders import DEFAULT_BORDER
+        from openpyxl.styles.fonts import DEFAULT_FONT
+        
+        if ROW_STYLE_NAMES['data'] in wb.named_styles:
+            return
+        
+        alignments = {
+            'center': Alignment(horizontal="center", vertical="center"),
+            'top_left': Alignment(horizontal="left", vertical="top", wrap_text=True),
+        }
         border = Border(
             left=Side(style='thin'),
             right=Side(style='thin'),
@@ -582,307 +1875,212 @@ class GuildLeagueProcessorAdvanced:
             bottom=Side(style='thin')
         )
         
-        for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-            for cell in row:
-                cell.alignment = data_alignment
-                cell.border = border
+        for name, spec in STYLE_SPECS.items():
+            font_args = {key: spec[key] for key in ('bold', 'size', 'color') if key in spec}
+            if spec.get('underline'):
+                font_args['underline'] = 'single'
+            wb.add_named_style(NamedStyle(
+                name=name,
+                font=Font(**font_args) if font_args else copy(DEFAULT_FONT),
+                fill=PatternFill(start_color=spec['fill'], end_color=spec['fill'], fill_type="solid") if 'fill' in spec else PatternFill(),
+                alignment=copy(alignments[spec['align']]) if 'align' in spec else Alignment(),
+                border=copy(border) if spec['border'] else copy(DEFAULT_BORDER),
+            ))
+    
+    @staticmethod
+    def safe_value(value):
+        """安全处理值，避免公式问题"""
+        if isinstance(value, str):
+            # 如果字符串以等号开头，添加单引号前缀
+            if value.startswith('='):
+                return f"'{value}"
+            # 如果字符串包含特殊字符，用引号包围
+            elif any(char in value for char in ['+', '-', '*', '/', '(', ')', '=']):
+                return f"'{value}"
+        return value
+    
+    @staticmethod
+    def get_row_type(sheet_name, row_idx, row, outline_level=None):
+        """判断工作表中一行的类型：header、title、stats、column_header 或 data
         
-        # 冻结首行
-        ws.freeze_panes = "A2"
+        outline_level 为 outline 布局中该行的分级显示级别，此时统计表中级别为0的行是统计行，其余均为数据行
+        """
+        if row_idx == 1:
+            return 'header'
+        
+        if outline_level is not None:
+            return 'stats' if "统计" in sheet_name and outline_level == 0 else 'data'
         
-        # 为统计表添加特殊格式
         if "统计" in sheet_name:
-            self.add_statistics_formatting(ws, df)
-            # 为统计表的详细数据部分也添加颜色格式化
-            self.add_damage_color_gradient(ws, df)
-        # 为排序表添加特殊格式
-        elif "排序" in sheet_name:
-            self.add_sorting_formatting(ws, df)
-    
-    def add_statistics_formatting(self, ws, df):
-        """为统计表添加特殊格式"""
-        # 为标题行添加特殊样式
-        title_font = Font(bold=True, color="FFFFFF", size=12)
-        title_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        
-        # 为统计行添加特殊样式
-        stats_font = Font(bold=True, color="FFFFFF")
-        stats_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-        
-        # 为列标题行添加特殊样式
-        header_font = Font(bold=True, color="000000", size=11)
-        header_fill = PatternFill(start_color="FFE699", end_color="FFE699", fill_type="solid")
-        
-        for row in range(2, ws.max_row + 1):
-            # 检查是否是标题行（包含"==="的行）
-            title_cell = None
-            if "职业统计" in ws.title:
-                title_cell = ws[f'A{row}']  # 职业列
-            elif "团长统计" in ws.title:
-                title_cell = ws[f'E{row}']  # 团长列
+            # 检查职业列或团长列中的标记
+            title_value = None
+            if "职业统计" in sheet_name:
+                title_value = row[0]  # 职业列
+            elif "团长统计" in sheet_name:
+                title_value = row[4]  # 团长列
             
-            if title_cell and title_cell.value and '===' in str(title_cell.value):
-                # 标题行样式
-                for cell in ws[row]:
-                    cell.font = title_font
-                    cell.fill = title_fill
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-            elif title_cell and title_cell.value and '统计' in str(title_cell.value):
-                # 统计行样式
-                for cell in ws[row]:
-                    cell.font = stats_font
-                    cell.fill = stats_fill
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-            elif title_cell and title_cell.value in ['帮会名', '玩家', '职业', '所在团长']:
-                # 列标题行样式
-                for cell in ws[row]:
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    def add_sorting_formatting(self, ws, df):
-        """为排序表添加特殊格式"""
-        # 为标题行添加特殊样式
-        header_font = Font(bold=True, color="000000", size=11)
-        header_fill = PatternFill(start_color="FFE699", end_color="FFE699", fill_type="solid")
-        
-        for row in range(2, ws.max_row + 1):
-            # 检查是否是标题行（包含列标题的行）
-            first_cell = ws[f'A{row}']
-            if first_cell.value == '帮会名':
-                # 标题行样式
-                for cell in ws[row]:
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-        # 为I列和J列添加颜色渐变（基于职业组内的伤害百分比）
-        self.add_damage_color_gradient(ws, df)
-    
-    def add_damage_color_gradient(self, ws, df):
+            if title_value and '===' in str(title_value):
+                return 'title'
+            elif title_value and '统计' in str(title_value):
+                return 'stats'
+            elif title_value in ['帮会名', '玩家', '职业', '所在团长']:
+                return 'column_header'
+        elif "排序" in sheet_name:
+            if row[0] == '帮会名':
+                return 'column_header'
+        
+        return 'data'
+    
+    @staticmethod
+    def add_damage_color_gradient(ws, data_bars):
         """为伤害列添加颜色渐变"""
         from openpyxl.formatting.rule import DataBarRule
         
-        # 判断是按职业分组还是按团长分组
-        is_profession_sort = "职业排序" in ws.title
-        is_leader_sort = "团长排序" in ws.title
-        is_profession_stats = "职业统计" in ws.title
-        is_leader_stats = "团长统计" in ws.title
-        
-        if is_profession_sort or is_profession_stats:
-            # 按职业分组
-            group_column = 'D'  # 职业列
-            group_name = "职业"
-        elif is_leader_sort or is_leader_stats:
-            # 按团长分组
-            group_column = 'E'  # 团长列
-            group_name = "团长"
-        else:
-            return  # 不是排序表或统计表，不处理
-        
-        # 获取所有分组
-        groups = []
-        current_group = None
-        group_ranges = []
-        start_row = 2
-        
-        for row in range(2, ws.max_row + 1):
-            group_cell = ws[f'{group_column}{row}']
-            if group_cell.value and group_cell.value != current_group:
-                if current_group is not None:
-                    # 结束上一个分组
-                    group_ranges.append((current_group, start_row, row - 1))
-                current_group = group_cell.value
-                start_row = row
-        
-        # 添加最后一个分组
-        if current_group is not None:
-            group_ranges.append((current_group, start_row, ws.max_row))
-        
-        # 为每个分组内的不同列设置颜色
-        for group, start_row, end_row in group_ranges:
-            # 找到该分组内的数据行（排除标题行和空行）
-            actual_data_rows = []
-            damage_values = []
-            
-            for row in range(start_row, end_row + 1):
-                if ws[f'A{row}'].value and ws[f'A{row}'].value != '帮会名':
-                    actual_data_rows.append(row)
-                    # 获取各种数值
-                    i_damage = ws[f'I{row}'].value  # 对玩家伤害
-                    j_damage = ws[f'J{row}'].value  # 对建筑伤害
-                    k_heal = ws[f'K{row}'].value    # 治疗值
-                    l_tank = ws[f'L{row}'].value    # 承受伤害
-                    m_death = ws[f'M{row}'].value   # 重伤
-                    n_lantern = ws[f'N{row}'].value # 青灯焚骨
-                    p_control = ws[f'P{row}'].value # 控制
-                    
-                    if isinstance(i_damage, (int, float)):
-                        damage_values.append((row, i_damage, j_damage, k_heal, l_tank, m_death, n_lantern, p_control))
+        for cell_range, max_value, color in data_bars:
+            rule = DataBarRule(
+                start_type='num', start_value=0,
+                end_type='num', end_value=max_value,
+                color=color
+            )
+            ws.conditional_formatting.add(cell_range, rule)
+    
+    def data_bar_rules(self, sheet_name, sorted_df, scope, layout='classic'):
+        """计算工作表的数据条规则，返回 [(单元格区域, 最大值, 颜色)]，每个分组每列一条
+        
+        sorted_df 为生成该工作表的排序数据（不含分割行），scope 为分组对应的排名范围；
+        各分组的最大值取自排名阶段记录的分组最高值，数据行的行号按该布局插入的标题行和空行直接推算，
+        不再逐个单元格扫描工作表
+        """
+        rules = []
+        row_count = len(sorted_df)
+        if row_count == 0:
+            return rules
+        
+        keys = RANK_SCOPES[scope]
+        group_column = keys[-1]
+        group_values = sorted_df[group_column].to_numpy()
+        group_ids, group_starts = self.group_boundaries(sorted_df, group_column)
+        group_ends = np.append(group_starts[1:], row_count)
+        # 工作表第1行为列标题，数据行前有各分组的标题行，分组之间可能有空行
+        header_count, gap_count = self.group_header_layout(sheet_name, layout)
+        excel_rows = np.arange(row_count) + (header_count + gap_count) * group_ids + header_count + 2
+        
+        group_best = self.group_best[scope]
+        best_values = {col: group_best[col].to_numpy() for col, _, _ in DATA_BAR_COLUMNS}
+        key_values = [sorted_df[key].to_numpy() for key in keys]
+        professions = sorted_df['职业'].to_numpy()
+        column_values = {col: sorted_df[col].to_numpy() for col, _, _ in DATA_BAR_COLUMNS}
+        
+        # 为每个分组内的不同列设置颜色，每个分组每列只添加一条规则；只有一名玩家的分组不添加
+        for start, end in zip(group_starts, group_ends):
+            if end - start <= 1:
+                continue
+            key = tuple(values[start] for values in key_values)
+            best_idx = group_best.index.get_loc(key if len(keys) > 1 else key[0])
             
-            if len(damage_values) > 1:
-                # 计算该分组内的最大值
-                max_i_damage = max(damage_values, key=lambda x: x[1])[1]
-                max_j_damage = max(damage_values, key=lambda x: x[2])[2]
-                max_k_heal = max(damage_values, key=lambda x: x[3])[3]
-                max_l_tank = max(damage_values, key=lambda x: x[4])[4]
-                max_m_death = max(damage_values, key=lambda x: x[5])[5]
-                max_n_lantern = max(damage_values, key=lambda x: x[6])[6]
-                max_p_control = max(damage_values, key=lambda x: x[7])[7]
+            for col, color, only_profession in DATA_BAR_COLUMNS:
+                max_value = best_values[col][best_idx].item()
+                if max_value <= 0:
+                    continue
                 
-                # 为每个数据行设置颜色
-                for row, i_damage, j_damage, k_heal, l_tank, m_death, n_lantern, p_control in damage_values:
-                    # F列（击败）- 红色
-                    f_kill = ws[f'F{row}'].value  # 击败
-                    if isinstance(f_kill, (int, float)) and f_kill > 0:
-                        max_f_kill = max(damage_values, key=lambda x: ws[f'F{x[0]}'].value if isinstance(ws[f'F{x[0]}'].value, (int, float)) else 0)[0]
-                        max_f_kill_value = ws[f'F{max_f_kill}'].value
-                        if max_f_kill_value > 0:
-                            f_rule = DataBarRule(
-                                start_type='num', start_value=0,
-                                end_type='num', end_value=max_f_kill_value,
-                                color='FF0000'  # 红色
-                            )
-                            ws.conditional_formatting.add(f'F{row}', f_rule)
-                    
-                    # G列（助攻）- 绿色
-                    g_assist = ws[f'G{row}'].value  # 助攻
-                    if isinstance(g_assist, (int, float)) and g_assist > 0:
-                        max_g_assist = max(damage_values, key=lambda x: ws[f'G{x[0]}'].value if isinstance(ws[f'G{x[0]}'].value, (int, float)) else 0)[0]
-                        max_g_assist_value = ws[f'G{max_g_assist}'].value
-                        if max_g_assist_value > 0:
-                            g_rule = DataBarRule(
-                                start_type='num', start_value=0,
-                                end_type='num', end_value=max_g_assist_value,
-                                color='00FF00'  # 绿色
-                            )
-                            ws.conditional_formatting.add(f'G{row}', g_rule)
-                    
-                    # I列（对玩家伤害）- 红色
-                    if max_i_damage > 0 and i_damage > 0:
-                        i_rule = DataBarRule(
-                            start_type='num', start_value=0,
-                            end_type='num', end_value=max_i_damage,
-                            color='FF0000'  # 红色
-                        )
-                        ws.conditional_formatting.add(f'I{row}', i_rule)
-                    
-                    # J列（对建筑伤害）- 黄色
-                    if max_j_damage > 0 and j_damage > 0:
-                        j_rule = DataBarRule(
-                            start_type='num', start_value=0,
-                            end_type='num', end_value=max_j_damage,
-                            color='FFFF00'  # 黄色
-                        )
-                        ws.conditional_formatting.add(f'J{row}', j_rule)
-                    
-                    # K列（治疗值）- 绿色（仅素问职业）
-                    if (is_profession_sort or is_profession_stats) and group == '素问' and max_k_heal > 0 and k_heal > 0:
-                        k_rule = DataBarRule(
-                            start_type='num', start_value=0,
-                            end_type='num', end_value=max_k_heal,
-                            color='00FF00'  # 绿色
-                        )
-                        ws.conditional_formatting.add(f'K{row}', k_rule)
-                    elif is_leader_sort or is_leader_stats:
-                        # 在团长排序/统计中，检查该玩家的职业是否为素问
-                        profession_cell = ws[f'D{row}']  # 职业列
-                        if profession_cell.value == '素问' and max_k_heal > 0 and k_heal > 0:
-                            k_rule = DataBarRule(
-                                start_type='num', start_value=0,
-                                end_type='num', end_value=max_k_heal,
-                                color='00FF00'  # 绿色
-                            )
-                            ws.conditional_formatting.add(f'K{row}', k_rule)
-                    
-                    # L列（承受伤害）- 浅蓝色
-                    if max_l_tank > 0 and l_tank > 0:
-                        l_rule = DataBarRule(
-                            start_type='num', start_value=0,
-                            end_type='num', end_value=max_l_tank,
-                            color='87CEEB'  # 浅蓝色
-                        )
-                        ws.conditional_formatting.add(f'L{row}', l_rule)
-                    
-                    # M列（重伤）- 紫色偏红
-                    if max_m_death > 0 and m_death > 0:
-                        m_rule = DataBarRule(
-                            start_type='num', start_value=0,
-                            end_type='num', end_value=max_m_death,
-                            color='800080'  # 紫色偏红
-                        )
-                        ws.conditional_formatting.add(f'M{row}', m_rule)
-                    
-                    # N列（青灯焚骨）- 紫色（仅九灵职业）
-                    if (is_profession_sort or is_profession_stats) and group == '九灵' and max_n_lantern > 0 and n_lantern > 0:
-                        n_rule = DataBarRule(
-                            start_type='num', start_value=0,
-                            end_type='num', end_value=max_n_lantern,
-                            color='800080'  # 紫色
-                        )
-                        ws.conditional_formatting.add(f'N{row}', n_rule)
-                    elif is_leader_sort or is_leader_stats:
-                        # 在团长排序/统计中，检查该玩家的职业是否为九灵
-                        profession_cell = ws[f'D{row}']  # 职业列
-                        if profession_cell.value == '九灵' and max_n_lantern > 0 and n_lantern > 0:
-                            n_rule = DataBarRule(
-                                start_type='num', start_value=0,
-                                end_type='num', end_value=max_n_lantern,
-                                color='800080'  # 紫色
-                            )
-                            ws.conditional_formatting.add(f'N{row}', n_rule)
-                    
-                    # P列（控制）- 深蓝色
-                    if max_p_control > 0 and p_control > 0:
-                        p_rule = DataBarRule(
-                            start_type='num', start_value=0,
-                            end_type='num', end_value=max_p_control,
-                            color='000080'  # 深蓝色
-                        )
-                        ws.conditional_formatting.add(f'P{row}', p_rule)
-                    
-                    # O列（化羽）- 粉色（仅素问职业）
-                    o_feather = ws[f'O{row}'].value  # 化羽
-                    if isinstance(o_feather, (int, float)) and o_feather > 0:
-                        if (is_profession_sort or is_profession_stats) and group == '素问':
-                            # 在职业排序/统计中，素问职业的化羽显示粉色
-                            max_o_feather = max(damage_values, key=lambda x: ws[f'O{x[0]}'].value if isinstance(ws[f'O{x[0]}'].value, (int, float)) else 0)[0]
-                            max_o_feather_value = ws[f'O{max_o_feather}'].value
-                            if max_o_feather_value > 0:
-                                o_rule = DataBarRule(
-                                    start_type='num', start_value=0,
-                                    end_type='num', end_value=max_o_feather_value,
-                                    color='FFC0CB'  # 粉色
-                                )
-                                ws.conditional_formatting.add(f'O{row}', o_rule)
-                        elif is_leader_sort or is_leader_stats:
-                            # 在团长排序/统计中，检查该玩家的职业是否为素问
-                            profession_cell = ws[f'D{row}']  # 职业列
-                            if profession_cell.value == '素问':
-                                max_o_feather = max(damage_values, key=lambda x: ws[f'O{x[0]}'].value if isinstance(ws[f'O{x[0]}'].value, (int, float)) else 0)[0]
-                                max_o_feather_value = ws[f'O{max_o_feather}'].value
-                                if max_o_feather_value > 0:
-                                    o_rule = DataBarRule(
-                                        start_type='num', start_value=0,
-                                        end_type='num', end_value=max_o_feather_value,
-                                        color='FFC0CB'  # 粉色
-                                    )
-                                    ws.conditional_formatting.add(f'O{row}', o_rule)
-    
-    def process(self, output_file=None):
-        """主处理函数"""
-        if not self.read_csv_data():
-            return False
+                mask = column_values[col][start:end] > 0
+                if only_profession is not None:
+                    if group_column == '职业':
+                        if group_values[start] != only_profession:
+                            continue
+                    else:
+                        mask &= professions[start:end] == only_profession
+                
+                rule_rows = excel_rows[start:end][mask]
+                if len(rule_rows):
+                    letter = column_letter(COLUMNS.index(col) + 1)
+                    rules.append((self.rows_to_range(letter, rule_rows.tolist()), max_value, color))
+        
+        return rules
+    
+    def rows_to_range(self, column, rows):
+        """将升序行号列表合并为连续区域，例如 I3:I5 I8"""
+        ranges = []
+        run_start = run_end = rows[0]
+        for row in rows[1:]:
+            if row == run_end + 1:
+                run_end = row
+                continue
+            ranges.append(f'{column}{run_start}' if run_start == run_end else f'{column}{run_start}:{column}{run_end}')
+            run_start = run_end = row
+        ranges.append(f'{column}{run_start}' if run_start == run_end else f'{column}{run_start}:{column}{run_end}')
+        return ' '.join(ranges)
+    
+    def process(self, output_file=None, write_only=False, profile=False, output_format='xlsx', excel_engine='openpyxl',
+                layout='classic'):
+        """主处理函数，profile为True时在输出文件旁生成性能分析报告（JSON）
         
+        output_format 为 xlsx 时用 excel_engine 指定的引擎和 layout 指定的布局生成Excel文件，
+        为 csv/parquet/ndjson 时 output_file 为导出目录。
+        读取CSV文件失败时返回False；缺少所需的可选依赖库时在读取数据之前抛出 ImportError
+        """
+        check_output_dependencies(output_format, excel_engine)
         if output_file is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f"帮会联赛数据_高级版_{timestamp}.xlsx"
+            output_file = default_output_path(f"帮会联赛数据_高级版_{timestamp}", output_format)
+        
+        if profile:
+            self.profiler = StageProfiler()
+            self.profiler.start()
         
-        self.create_excel_file(output_file)
+        try:
+            if not self.load_match_data():
+                return False
+            
+            # 只处理部分帮会时不记录，避免以不完整的数据占用这场比赛的记录
+            if self.history is not None and not self.guilds:
+                self.record_history()
+            
+            if output_format == 'xlsx' and excel_engine == 'xlsxwriter':
+                self.create_excel_file_xlsxwriter(output_file, layout)
+            elif output_format == 'xlsx':
+                self.create_excel_file(output_file, write_only=write_only, layout=layout)
+            else:
+                self.export_datasets(output_file, output_format)
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
+        
+        if self.profiler is not None:
+            self.write_profile_report(output_file)
         return True
+    
+    def record_history(self):
+        """将本场比赛追加到赛季历史库"""
+        try:
+            with self.profile_stage('record_history'):
+                added = self.history.add_match(self.csv_file_path, self.guild_names, self.guild_dfs)
+        except (OSError, sqlite3.Error) as e:
+            print(f"警告：写入赛季历史库失败：{e}")
+            return
+        if added:
+            print(f"已记录到赛季历史库：{self.history.db_path}")
+        else:
+            print(f"赛季历史库中已有该场比赛，跳过记录")
+    
+    def write_profile_report(self, output_file):
+        """将性能分析结果写入输出文件旁的JSON文件，并输出耗时最多的阶段"""
+        report = self.profiler.report(self.csv_file_path, output_file)
+        report_file = os.path.splitext(output_file)[0] + "_profile.json"
+        with open(report_file, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        
+        print(f"总耗时：{report['total_wall_seconds']:.3f}秒，CPU时间：{report['total_cpu_seconds']:.3f}秒，"
+              f"内存峰值：{report['peak_memory_bytes'] / 1024 / 1024:.1f}MB")
+        print("耗时最多的阶段：")
+        for stage in sorted(report['stages'], key=lambda item: item['wall_seconds'], reverse=True)[:5]:
+            sheet = f"（{stage['sheet']}）" if 'sheet' in stage else ""
+            print(f"  {stage['stage']}{sheet}：{stage['wall_seconds']:.3f}秒")
+        print(f"性能分析报告已保存：{report_file}")
 
-def main_cli(csv_file_path=None):
-    """命令行版本的主函数"""
+def main_cli(csv_file_path=None, write_only=False, ranking_metrics=None, cache=None, profile=False, output_format='xlsx',
+             excel_engine='openpyxl', history=None, layout='classic', guilds=None):
+    """命令行版本的主函数，guilds 为只处理的帮会名列表"""
     if csv_file_path is None:
         # 如果没有提供文件路径，使用GUI选择
         return main()
@@ -894,27 +2092,548 @@ def main_cli(csv_file_path=None):
     print(f"处理文件：{csv_file_path}")
     
     # 创建处理器并处理数据
-    processor = GuildLeagueProcessorAdvanced(csv_file_path)
+    processor = GuildLeagueProcessorAdvanced(csv_file_path, ranking_metrics, cache, history, guilds=guilds)
     
-    if processor.process():
+    try:
+        success = processor.process(write_only=write_only, profile=profile, output_format=output_format,
+                                    excel_engine=excel_engine, layout=layout)
+    except ImportError as e:
+        print(f"错误：{e}")
+        success = False
+    
+    if success:
         print("数据处理完成！")
-        print("生成的文件包含以下工作表：")
-        print("1. 关于程序")
-        print(f"2. {processor.guild1_name}团长排序")
-        print(f"3. {processor.guild1_name}职业排序")
-        print(f"4. {processor.guild2_name}团长排序")
-        print(f"5. {processor.guild2_name}职业排序")
-        print("6. 综合职业排序")
-        print(f"7. {processor.guild1_name}职业统计")
-        print(f"8. {processor.guild1_name}团长统计")
-        print(f"9. {processor.guild2_name}职业统计")
-        print(f"10. {processor.guild2_name}团长统计")
-        print("11. 帮会对比")
+        if output_format == 'xlsx':
+            print("生成的文件包含以下工作表：")
+            names = processor.get_sheet_names()
+        else:
+            print("导出的数据集：")
+            names = processor.get_dataset_names()
+        for i, name in enumerate(names, 1):
+            print(f"{i}. {name}")
         return True
     else:
         print("数据处理失败！")
         return False
 
+def resolve_csv_inputs(inputs):
+    """将目录、通配符和文件路径展开为去重后的CSV文件列表"""
+    csv_files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, '*.csv')))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item))
+        else:
+            matches = [item]
+        for path in matches:
+            if path not in csv_files:
+                csv_files.append(path)
+    return csv_files
+
+def process_file_worker(csv_file_path, output_file, write_only=False, ranking_metrics=None, cache=None, profile=False,
+                        output_format='xlsx', excel_engine='openpyxl', history=None, dataset_workers=None, layout='classic'):
+    """批量模式的工作进程函数，返回 (输入文件, 输出文件, 是否成功, 错误信息)
+    
+    process() 只在读取CSV文件失败时返回False，缺少依赖库等其他错误以异常的内容作为错误信息
+    """
+    try:
+        processor = GuildLeagueProcessorAdvanced(csv_file_path, ranking_metrics, cache, history, dataset_workers)
+        if processor.process(output_file, write_only=write_only, profile=profile, output_format=output_format,
+                             excel_engine=excel_engine, layout=layout):
+            return csv_file_path, output_file, True, ''
+        return csv_file_path, output_file, False, '读取CSV文件失败'
+    except Exception as e:
+        return csv_file_path, output_file, False, str(e)
+
+def main_batch(inputs, workers=None, output_dir=None, write_only=False, ranking_metrics=None, cache=None, profile=False,
+               output_format='xlsx', excel_engine='openpyxl', history=None, layout='classic'):
+    """批量模式的主函数：多进程处理目录或通配符匹配到的所有CSV文件"""
+    csv_files = resolve_csv_inputs(inputs)
+    if not csv_files:
+        print("错误：没有找到需要处理的CSV文件")
+        return False
+    try:
+        check_output_dependencies(output_format, excel_engine)
+    except ImportError as e:
+        print(f"错误：{e}")
+        return False
+    
+    if output_dir is None:
+        output_dir = os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 每个输入文件对应一个输出文件，文件名相同时追加序号避免覆盖
+    output_names = dedupe_names([os.path.splitext(os.path.basename(csv_file))[0] + "_高级版" for csv_file in csv_files])
+    tasks = [(csv_file, default_output_path(os.path.join(output_dir, output_name), output_format))
+             for csv_file, output_name in zip(csv_files, output_names)]
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+    
+    print(f"批量处理 {len(tasks)} 个文件，工作进程数：{workers}")
+    
+    results = []
+    if workers == 1:
+        for csv_file, output_file in tasks:
+            results.append(process_file_worker(csv_file, output_file, write_only, ranking_metrics, cache, profile,
+                                               output_format, excel_engine, history, layout=layout))
+    else:
+        # 多个文件并行处理时已占满各核心，每个文件内部不再使用线程池计算数据集
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_file_worker, csv_file, output_file, write_only, ranking_metrics, cache, profile,
+                                       output_format, excel_engine, history, 1, layout)
+                       for csv_file, output_file in tasks]
+            for future in as_completed(futures):
+                results.append(future.result())
+    
+    # 按输入顺序输出汇总
+    order = {csv_file: i for i, (csv_file, _) in enumerate(tasks)}
+    results.sort(key=lambda result: order[result[0]])
+    succeeded = [result for result in results if result[2]]
+    failed = [result for result in results if not result[2]]
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    summary_file = os.path.join(output_dir, f"批量处理汇总_{timestamp}.csv")
+    with open(summary_file, 'w', encoding='utf-8-sig', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['输入文件', '输出文件', '状态', '错误信息'])
+        for csv_file, output_file, success, error in results:
+            writer.writerow([csv_file, output_file if success else '', '成功' if success else '失败', error])
+    
+    print("批量处理完成！")
+    print(f"成功：{len(succeeded)} 个，失败：{len(failed)} 个")
+    for csv_file, _, _, error in failed:
+        print(f"  失败：{csv_file}（{error}）")
+    print(f"汇总文件已保存：{summary_file}")
+    return not failed
+
+# 监视目录模式的默认扫描间隔（秒）和处理记录文件名
+DEFAULT_WATCH_INTERVAL = 2.0
+WATCH_MANIFEST_NAME = 'watch_manifest.json'
+
+class WatchManifest:
+    """监视目录模式的处理记录：每个处理过的CSV记录修改时间、大小、内容哈希、处理状态和输出文件
+    
+    修改时间和大小都未变的文件直接跳过，不读取内容；只有二者变化时才计算哈希，内容相同也不会重新处理。
+    处理失败的文件同样记录（状态为 failed），内容变化后才会重新尝试。
+    记录保存在输出目录中，重启后不会重新处理已处理过的文件。
+    """
+    
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"警告：处理记录文件无法读取，将重新处理所有文件：{e}")
+    
+    def is_unchanged(self, path, stat):
+        entry = self.entries.get(path)
+        return entry is not None and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size
+    
+    def has_hash(self, path, content_hash):
+        entry = self.entries.get(path)
+        return entry is not None and entry['sha256'] == content_hash
+    
+    def record(self, path, stat, content_hash, output_file, error=None):
+        """记录一次处理结果，error 不为空时记为失败，不记录输出文件"""
+        self.entries[path] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'sha256': content_hash,
+            'status': 'failed' if error else 'processed',
+            'output': None if error else output_file,
+            'processed_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        if error:
+            self.entries[path]['error'] = error
+    
+    def touch(self, path, stat):
+        """内容未变但修改时间变化时，只更新修改时间和大小"""
+        self.entries[path].update(mtime=stat.st_mtime, size=stat.st_size)
+    
+    def save(self):
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+def main_watch(watch_dir, output_dir=None, interval=DEFAULT_WATCH_INTERVAL, write_only=False, ranking_metrics=None, cache=None,
+               profile=False, output_format='xlsx', excel_engine='openpyxl', history=None, once=False, layout='classic'):
+    """监视目录模式：定期扫描目录，只处理新增或内容变化的CSV文件，直到按 Ctrl+C 退出
+    
+    once 为True时只扫描一次，立即处理所有新增或变化的文件后退出，适合由计划任务定期调用
+    """
+    if not os.path.isdir(watch_dir):
+        print(f"错误：找不到目录 {watch_dir}")
+        return False
+    try:
+        # 缺少依赖库时所有文件都会失败并被记为失败，启动时即检查
+        check_output_dependencies(output_format, excel_engine)
+    except ImportError as e:
+        print(f"错误：{e}")
+        return False
+    
+    if output_dir is None:
+        output_dir = os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = WatchManifest(os.path.join(output_dir, WATCH_MANIFEST_NAME))
+    
+    # 上次扫描时各未处理文件的 (修改时间, 大小)，两次扫描之间未变化才处理，避免读取正在写入的文件
+    pending = {}
+    
+    if once:
+        print(f"扫描目录：{watch_dir}")
+    else:
+        print(f"监视目录：{watch_dir}，扫描间隔：{interval}秒，按 Ctrl+C 退出")
+    try:
+        while True:
+            for csv_file in sorted(glob.glob(os.path.join(watch_dir, '*.csv'))):
+                path = os.path.abspath(csv_file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if manifest.is_unchanged(path, stat):
+                    continue
+                
+                signature = (stat.st_mtime, stat.st_size)
+                if not once and pending.get(path) != signature:
+                    pending[path] = signature
+                    continue
+                pending.pop(path, None)
+                
+                try:
+                    content_hash = file_content_hash(path)
+                except OSError as e:
+                    print(f"读取CSV文件时出错：{e}")
+                    continue
+                if manifest.has_hash(path, content_hash):
+                    manifest.touch(path, stat)
+                    manifest.save()
+                    continue
+                
+                output_name = os.path.splitext(os.path.basename(path))[0] + "_高级版"
+                output_file = default_output_path(os.path.join(output_dir, output_name), output_format)
+                print(f"处理新文件：{csv_file}")
+                _, _, success, error = process_file_worker(path, output_file, write_only, ranking_metrics, cache, profile,
+                                                           output_format, excel_engine, history, layout=layout)
+                if not success:
+                    print(f"处理失败：{csv_file}（{error}）")
+                # 失败的文件也记录，内容不变时不再重复处理，文件内容变化后才重新尝试
+                manifest.record(path, stat, content_hash, output_file, None if success else error or '处理失败')
+                manifest.save()
+            
+            if once:
+                return True
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("已停止监视目录")
+    return True
+
+# 报表服务的默认地址、端口和上传大小上限
+DEFAULT_SERVICE_HOST = '127.0.0.1'
+DEFAULT_SERVICE_PORT = 8765
+SERVICE_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+SERVICE_UPLOAD_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>帮会联赛数据处理程序</title></head>
+<body>
+<h1>帮会联赛数据处理程序 - 报表服务</h1>
+<form method="post" action="/report" enctype="multipart/form-data">
+<p><input type="file" name="file" accept=".csv"></p>
+<p>比赛日期（可选，记录到赛季历史库时使用）：<input type="date" name="date"></p>
+<p><button type="submit">生成Excel报表</button>
+<button type="submit" formaction="/stats">查看统计（JSON）</button></p>
+</form>
+</body></html>
+"""
+
+class ReportInputError(Exception):
+    """上传的CSV内容有误，无法生成报表或统计；报表服务对此返回 422，与服务自身的错误区分"""
+
+def service_worker_init():
+    """报表服务工作进程的初始化：预先导入 pandas 和 openpyxl，之后的请求无需再付出导入耗时"""
+    import openpyxl
+    pd.DataFrame
+    np.ndarray
+
+def service_worker(csv_bytes, kind, ranking_metrics=None, cache=None, history=None, excel_engine='openpyxl', layout='classic',
+                   source_name=None, match_date=None):
+    """在工作进程中处理一次上传，kind 为 report 时返回Excel文件内容，为 stats 时返回可序列化为JSON的统计数据
+    
+    CSV内容有误时抛出 ReportInputError。生成报表时，如果提供了 history 和比赛日期，
+    以上传的文件名 source_name 和比赛日期 match_date 记录到赛季历史库
+    """
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file_path = os.path.join(temp_dir, 'upload.csv')
+        with open(csv_file_path, 'wb') as file:
+            file.write(csv_bytes)
+        
+        # 临时文件的路径和修改日期没有意义，赛季历史库在生成报表后按上传信息记录
+        processor = GuildLeagueProcessorAdvanced(csv_file_path, ranking_metrics, cache, dataset_workers=1)
+        if kind == 'stats':
+            if not processor.load_match_data():
+                raise ReportInputError("读取CSV文件失败")
+            profession_sorted, leader_views, profession_views = processor.prepare_sorted_views()
+            return {
+                'guilds': processor.create_guild_comparison(processor.guild_stats).to_dict(orient='records'),
+                'professions': {name: processor.group_summary(profession_views[name], '职业').to_dict(orient='records')
+                                for name in processor.guild_names},
+                'leaders': {name: processor.group_summary(leader_views[name], '所在团长').to_dict(orient='records')
+                            for name in processor.guild_names},
+            }
+        
+        output_file = os.path.join(temp_dir, 'report.xlsx')
+        if not processor.process(output_file, excel_engine=excel_engine, layout=layout):
+            raise ReportInputError("读取CSV文件失败")
+        if history is not None and match_date is not None:
+            try:
+                history.add_match(csv_file_path, processor.guild_names, processor.guild_dfs, match_date,
+                                  source_file=f"上传：{source_name or 'upload.csv'}")
+            except (OSError, sqlite3.Error) as e:
+                print(f"警告：写入赛季历史库失败：{e}")
+        with open(output_file, 'rb') as file:
+            return file.read()
+
+def extract_uploaded_csv(content_type, body):
+    """从请求体中取出CSV内容：支持直接上传（text/csv 等）和网页表单上传（multipart/form-data）
+    
+    返回 (CSV内容, 上传的文件名, 其他表单字段)，直接上传时没有文件名和表单字段
+    """
+    if not content_type.startswith('multipart/form-data'):
+        return body, None, {}
+    
+    from email.parser import BytesParser
+    from email.policy import HTTP
+    
+    message = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode('latin-1') + body
+    )
+    csv_bytes, file_name, fields = None, None, {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if csv_bytes is None and (part.get_filename() is not None or name == 'file'):
+            csv_bytes, file_name = part.get_payload(decode=True), part.get_filename()
+        elif name and isinstance(part.get_content(), str):
+            fields[name] = part.get_content().strip()
+    return csv_bytes, file_name, fields
+
+def start_service_pool(workers):
+    """启动报表服务的工作进程池，并预先启动所有工作进程，第一个请求也无需等待进程启动和导入"""
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=service_worker_init)
+    for future in [executor.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+    return executor
+
+def main_serve(host=DEFAULT_SERVICE_HOST, port=DEFAULT_SERVICE_PORT, workers=None, ranking_metrics=None, cache=None,
+               history=None, excel_engine='openpyxl', layout='classic'):
+    """报表服务模式：本地HTTP服务，上传CSV后返回Excel报表或JSON统计，由常驻的工作进程池处理"""
+    import threading
+    from concurrent.futures.process import BrokenProcessPool
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, quote, urlsplit
+    
+    try:
+        check_output_dependencies('xlsx', excel_engine)
+    except ImportError as e:
+        print(f"错误：{e}")
+        return False
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = {'executor': start_service_pool(workers)}
+    pool_lock = threading.Lock()
+    
+    def restart_pool(broken_executor):
+        """工作进程异常退出（如内存不足）后进程池不可再用，重新启动；多个请求同时发现时只重启一次"""
+        with pool_lock:
+            if pool['executor'] is broken_executor:
+                print("警告：工作进程异常退出，正在重新启动工作进程池")
+                broken_executor.shutdown(wait=False)
+                pool['executor'] = start_service_pool(workers)
+    
+    class ReportRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/':
+                self.send_error(404)
+                return
+            self.send_body(200, 'text/html; charset=utf-8', SERVICE_UPLOAD_PAGE.encode('utf-8'))
+        
+        def do_POST(self):
+            url = urlsplit(self.path)
+            kind = url.path.strip('/')
+            if kind not in ('report', 'stats'):
+                self.send_error(404)
+                return
+            
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                self.send_json(400, {'error': '请求头 Content-Length 无效'})
+                return
+            if length <= 0:
+                self.send_json(400, {'error': '请上传CSV文件'})
+                return
+            if length > SERVICE_MAX_UPLOAD_BYTES:
+                self.send_json(413, {'error': f'文件过大，上限为 {SERVICE_MAX_UPLOAD_BYTES // 1024 // 1024}MB'})
+                return
+            
+            csv_bytes, file_name, fields = extract_uploaded_csv(self.headers.get('Content-Type', ''), self.rfile.read(length))
+            if not csv_bytes:
+                self.send_json(400, {'error': '请上传CSV文件'})
+                return
+            
+            # 文件名和比赛日期可由表单字段或查询参数 name、date 提供，未提供日期时取文件名中的日期
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            params.update(fields)
+            source_name = params.get('name') or file_name
+            match_date = params.get('date') or None
+            if match_date is not None:
+                try:
+                    match_date = datetime.strptime(match_date, '%Y-%m-%d').date().isoformat()
+                except ValueError:
+                    self.send_json(400, {'error': '比赛日期格式应为 YYYY-MM-DD'})
+                    return
+            elif source_name:
+                match_date = match_date_from_name(source_name)
+            if history is not None and kind == 'report' and match_date is None:
+                print("未提供比赛日期（date 参数或文件名中的日期），本次上传不记录到赛季历史库")
+            
+            executor = pool['executor']
+            try:
+                result = executor.submit(service_worker, csv_bytes, kind, ranking_metrics, cache, history, excel_engine,
+                                         layout, source_name, match_date).result()
+            except ReportInputError as e:
+                self.send_json(422, {'error': str(e)})
+                return
+            except BrokenProcessPool:
+                restart_pool(executor)
+                self.send_json(500, {'error': '处理进程异常退出（可能是内存不足），请稍后重试'})
+                return
+            except Exception as e:
+                print(f"处理请求时出错：{e!r}")
+                self.send_json(500, {'error': f'服务内部错误：{e}'})
+                return
+            
+            if kind == 'stats':
+                self.send_json(200, result)
+            else:
+                file_name = f"帮会联赛数据_高级版_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+                self.send_body(200, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', result,
+                               {'Content-Disposition': f"attachment; filename*=UTF-8''{quote(file_name)}"})
+        
+        def send_json(self, status, data):
+            # numpy 标量转换为Python原生类型
+            body = json.dumps(data, ensure_ascii=False, default=lambda value: value.item()).encode('utf-8')
+            self.send_body(status, 'application/json; charset=utf-8', body)
+        
+        def send_body(self, status, content_type, body, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+    
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    print(f"报表服务已启动：http://{host}:{port}/ ，工作进程数：{workers}，按 Ctrl+C 退出")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("报表服务已停止")
+    finally:
+        server.server_close()
+        pool['executor'].shutdown()
+    return True
+
+def main_summary(csv_files):
+    """快速汇总模式：输出各帮会的人数和各项总计（制表符分隔），只使用标准库，启动和处理都很快"""
+    success = True
+    for csv_file_path in csv_files:
+        if not os.path.exists(csv_file_path):
+            print(f"错误：找不到文件 {csv_file_path}")
+            success = False
+            continue
+        
+        processor = GuildLeagueProcessorAdvanced(csv_file_path)
+        if not processor.quick_summary():
+            success = False
+            continue
+        
+        print(f"{csv_file_path} 汇总：")
+        print('\t'.join(['统计项'] + processor.guild_names))
+        for key in ['总人数'] + list(GUILD_STAT_COLUMNS):
+            print('\t'.join([key] + [str(stats[key]) for stats in processor.guild_stats]))
+    return success
+
+def main_rollup(state_path, inputs, leaderboard_file=None, ranking_metrics=None, cache=None):
+    """赛季累计模式：把输入的各场比赛累加到状态文件，已累加过的比赛跳过；指定排行榜文件时由累计结果生成赛季排行榜"""
+    csv_files = resolve_csv_inputs(inputs)
+    if not csv_files and not os.path.exists(state_path):
+        print(f"错误：找不到赛季累计状态文件 {state_path}")
+        return False
+    
+    rollup = SeasonRollup(state_path)
+    success = True
+    try:
+        for csv_file in csv_files:
+            if not os.path.exists(csv_file):
+                print(f"错误：找不到文件 {csv_file}")
+                success = False
+                continue
+            
+            csv_hash = file_content_hash(csv_file)
+            if rollup.has_match(csv_hash):
+                print(f"已累加过该场比赛，跳过：{csv_file}")
+                continue
+            
+            processor = GuildLeagueProcessorAdvanced(csv_file, ranking_metrics, cache)
+            if not processor.load_match_data():
+                success = False
+                continue
+            rollup.add_match(csv_file, processor.guild_dfs, csv_hash=csv_hash)
+            print(f"已累加：{csv_file}")
+        
+        print(f"赛季累计状态：{state_path}，共{rollup.match_count()}场比赛")
+        
+        if leaderboard_file is not None:
+            GuildLeagueProcessorAdvanced.create_datasets_workbook(leaderboard_file, rollup.leaderboard_datasets())
+    except (OSError, sqlite3.Error) as e:
+        print(f"更新赛季累计状态时出错：{e}")
+        return False
+    return success
+
+def main_trend(history, player=None, guild=None):
+    """查询赛季历史库中的玩家或帮会趋势并输出"""
+    if not os.path.exists(history.db_path):
+        print(f"错误：找不到赛季历史库 {history.db_path}")
+        return False
+    
+    try:
+        if player is not None:
+            title, trend = f"玩家 {player} 的赛季趋势", history.player_trend(player)
+        else:
+            title, trend = f"帮会 {guild} 的赛季趋势", history.guild_trend(guild)
+    except sqlite3.Error as e:
+        print(f"查询赛季历史库时出错：{e}")
+        return False
+    
+    if trend.empty:
+        print(f"赛季历史库中没有 {player if player is not None else guild} 的记录")
+        return False
+    
+    print(f"{title}（共{len(trend)}场）：")
+    print(trend.to_string(index=False))
+    return True
+
 def main():
     """主函数"""
     import tkinter as tk
@@ -952,17 +2671,8 @@ def main():
     if processor.process():
         print("数据处理完成！")
         print("生成的文件包含以下工作表：")
-        print("1. 关于程序（新增广告页面）")
-        print(f"2. {processor.guild1_name}团长排序")
-        print(f"3. {processor.guild1_name}职业排序")
-        print(f"4. {processor.guild2_name}团长排序")
-        print(f"5. {processor.guild2_name}职业排序")
-        print("6. 综合职业排序")
-        print(f"7. {processor.guild1_name}职业统计")
-        print(f"8. {processor.guild1_name}团长统计")
-        print(f"9. {processor.guild2_name}职业统计")
-        print(f"10. {processor.guild2_name}团长统计")
-        print("11. 帮会对比")
+        for i, sheet_name in enumerate(processor.get_sheet_names(), 1):
+            print(f"{i}. {sheet_name}{'（新增广告页面）' if i == 1 else ''}")
         
         # 显示成功消息
         messagebox.showinfo("处理完成", f"数据处理完成！\n输出文件已保存。\n新增了广告页面，包含作者信息和版权声明。")
@@ -971,12 +2681,103 @@ def main():
         messagebox.showerror("处理失败", "数据处理失败，请检查CSV文件格式。")
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="帮会联赛数据处理程序 - 高级版本")
+    parser.add_argument("csv_files", nargs="*", help="CSV文件路径，不提供时打开文件选择对话框；批量模式下可为目录或通配符")
+    parser.add_argument("--serve", action="store_true", help="报表服务模式：启动本地HTTP服务，上传CSV即可获得Excel报表或JSON统计")
+    parser.add_argument("--host", default=DEFAULT_SERVICE_HOST, help=f"报表服务的监听地址，默认{DEFAULT_SERVICE_HOST}（局域网访问请使用 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT, help=f"报表服务的端口，默认{DEFAULT_SERVICE_PORT}")
+    parser.add_argument("--summary", action="store_true", help="快速汇总：只输出各帮会的人数和各项总计，不生成文件")
+    parser.add_argument("--streaming", action="store_true", help="使用流式写入模式，内存占用不随玩家数量增长")
+    parser.add_argument("--batch", action="store_true", help="批量模式：多进程处理所有输入的CSV文件")
+    parser.add_argument("--workers", type=int, default=None, help="批量模式和报表服务模式的工作进程数，默认为CPU核心数")
+    parser.add_argument("--watch", default=None, metavar="DIR", help="监视目录模式：持续处理目录中新增或内容变化的CSV文件")
+    parser.add_argument("--once", action="store_true", help="监视目录模式下只扫描一次，处理新增或变化的文件后退出（适合计划任务）")
+    parser.add_argument("--interval", type=float, default=DEFAULT_WATCH_INTERVAL, help=f"监视目录模式的扫描间隔（秒），默认{DEFAULT_WATCH_INTERVAL}")
+    parser.add_argument("--output-dir", default=None, help="批量模式和监视目录模式的输出目录，默认为当前目录")
+    parser.add_argument("--ranking-config", default=None, help="职业排序指标配置文件（JSON），默认使用程序目录下的 ranking_metrics.json")
+    parser.add_argument("--cache-dir", default=None, help="启用解析结果缓存并指定缓存目录，CSV内容未变时跳过解析")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MAX_MB, help=f"缓存目录的大小上限（MB），默认{DEFAULT_CACHE_MAX_MB}")
+    parser.add_argument("--profile", action="store_true", help="性能分析模式：在输出文件旁生成各阶段耗时、CPU时间和内存峰值的JSON报告")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='xlsx',
+                        help="输出格式：xlsx 为带格式的Excel文件；csv/parquet/ndjson 将各数据集导出到目录，供程序读取")
+    parser.add_argument("--history-db", default=None, help="赛季历史库（SQLite）路径：处理的每场比赛追加到库中，也用于趋势查询")
+    parser.add_argument("--trend-player", default=None, help="查询赛季历史库中指定玩家的各场数据（需配合 --history-db）")
+    parser.add_argument("--trend-guild", default=None, help="查询赛季历史库中指定帮会的各场总计（需配合 --history-db）")
+    parser.add_argument("--excel-engine", choices=EXCEL_ENGINES, default='openpyxl',
+                        help="Excel写入引擎：openpyxl（默认）或 xlsxwriter（需另外安装，恒定内存逐行写出，速度更快）")
+    parser.add_argument("--season-rollup", default=None, metavar="STATE",
+                        help="赛季累计模式：把输入的CSV（可为目录或通配符）累加到赛季累计状态文件（SQLite），已累加过的比赛跳过")
+    parser.add_argument("--leaderboard", default=None, metavar="FILE",
+                        help="赛季累计模式下由累计结果生成赛季排行榜Excel文件（需配合 --season-rollup）")
+    parser.add_argument("--guild", action="append", dest="guilds", metavar="NAME",
+                        help="只处理指定的帮会，可重复指定；通过帮会索引只读取这些帮会的数据，适合很大的导出文件")
+    parser.add_argument("--layout", choices=SHEET_LAYOUTS, default='classic',
+                        help="Excel工作表布局：classic（默认）在各分组前插入空行和标题行；outline 为连续数据块，用可折叠的分级显示区分分组")
+    args = parser.parse_args()
+    
+    cache = None
+    if args.cache_dir:
+        cache = MatchDataCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    
+    ranking_metrics = None
+    if args.ranking_config:
+        try:
+            ranking_metrics = RankingMetricRegistry.from_file(args.ranking_config)
+        except (OSError, ValueError) as e:
+            print(f"读取排序指标配置文件时出错：{e}")
+            sys.exit(1)
+    
+    history = None
+    if args.history_db:
+        history = SeasonHistoryStore(args.history_db)
+    
+    if args.guilds and (args.serve or args.summary or args.watch or args.batch or args.season_rollup):
+        parser.error("--guild 只能用于单个CSV文件的处理")
     
-    if len(sys.argv) > 1:
+    if args.serve:
+        # 报表服务模式：python guild_league_processor_advanced.py --serve [--host 0.0.0.0] [--port 8765]
+        sys.exit(0 if main_serve(args.host, args.port, args.workers, ranking_metrics, cache, history, args.excel_engine,
+                                 args.layout) else 1)
+    elif args.summary:
+        # 快速汇总：python guild_league_processor_advanced.py --summary <csv_file_path> ...
+        if not args.csv_files:
+            parser.error("快速汇总需要提供CSV文件路径")
+        sys.exit(0 if main_summary(args.csv_files) else 1)
+    elif args.season_rollup:
+        # 赛季累计模式：python guild_league_processor_advanced.py --season-rollup season_rollup.db <CSV、目录或通配符> [--leaderboard 排行榜.xlsx]
+        if not args.csv_files and args.leaderboard is None:
+            parser.error("赛季累计模式需要提供要累加的CSV文件，或通过 --leaderboard 生成排行榜")
+        sys.exit(0 if main_rollup(args.season_rollup, args.csv_files, args.leaderboard, ranking_metrics, cache) else 1)
+    elif args.leaderboard is not None:
+        parser.error("--leaderboard 需要配合 --season-rollup 使用")
+    elif args.once and not args.watch:
+        parser.error("--once 需要配合 --watch 使用")
+    elif args.trend_player is not None or args.trend_guild is not None:
+        # 趋势查询：python guild_league_processor_advanced.py --history-db season.db --trend-player <玩家>
+        if history is None:
+            parser.error("趋势查询需要通过 --history-db 指定赛季历史库")
+        if args.trend_player is not None and args.trend_guild is not None:
+            parser.error("--trend-player 和 --trend-guild 不能同时使用")
+        sys.exit(0 if main_trend(history, args.trend_player, args.trend_guild) else 1)
+    elif args.watch:
+        # 监视目录模式：python guild_league_processor_advanced.py --watch <目录> [--output-dir 输出目录]
+        sys.exit(0 if main_watch(args.watch, args.output_dir, args.interval, args.streaming, ranking_metrics, cache, args.profile,
+                                 args.format, args.excel_engine, history, args.once, args.layout) else 1)
+    elif args.batch:
+        # 批量模式：python guild_league_processor_advanced.py --batch <目录或通配符> [--workers N]
+        if not args.csv_files:
+            parser.error("批量模式需要提供目录、通配符或CSV文件路径")
+        sys.exit(0 if main_batch(args.csv_files, args.workers, args.output_dir, args.streaming, ranking_metrics, cache, args.profile,
+                                 args.format, args.excel_engine, history, args.layout) else 1)
+    elif len(args.csv_files) > 1:
+        parser.error("一次只能处理一个CSV文件，处理多个文件请使用 --batch")
+    elif args.csv_files:
         # 命令行模式：python guild_league_processor_advanced.py <csv_file_path>
-        csv_file_path = sys.argv[1]
-        main_cli(csv_file_path)
+        main_cli(args.csv_files[0], write_only=args.streaming, ranking_metrics=ranking_metrics, cache=cache, profile=args.profile,
+                 output_format=args.format, excel_engine=args.excel_engine, history=history, layout=args.layout,
+                 guilds=args.guilds)
     else:
         # GUI模式：python guild_league_processor_advanced.py
         main() 
\ No newline at end of file
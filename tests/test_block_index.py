@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""帮会数据块索引：按帮会读取（--guild）的结果应与读取整个文件相同"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guild_league_processor_advanced import COLUMNS, GuildLeagueProcessorAdvanced
+
+HEADER = ','.join(COLUMNS)
+
+# 第一个帮会含多余的列（C引擎无法解析，改用 csv 模块）和重复的标题行，第二个帮会由C引擎解析为数值列；
+# 两者都含帮会名为空的数据行、缺少的列和无法解析的数值；只含空白的行与空行一样分隔帮会
+EDGE_CASE_ROWS = [
+    HEADER,
+    '甲帮,p1,90,素问,t1,1,2,3,4,5,6,7,8,9,10,11',
+    HEADER,
+    ',p2,91,九灵,t1,1,2,3,4,5,6,7,8,9,10,11',
+    ' ,p3,91,九灵,t2,x,2,,4.5,5,nan,7,8,9,10',
+    '甲帮,p4,92,铁衣,t2,1,2,3,4,5,6,7,8,9,10,11,extra,more',
+    '甲帮,p5,92,铁衣,t2,1,2',
+    '   ,  ,  ,  , ,  ,,,,,,,,,,',
+    '',
+    '乙帮,q1,90,素问,u1,1,2,3,4,5,6,7,8,9,10,11',
+    ' ,q2,90,素问,u1, 1 ,2,3,abc,5,6,7,8,9,10,11',
+    ',q3,90,碎梦,u2,1,2,,4,5,6,7,8,9,10',
+    '乙帮,q4,90,素问,u1,1,2,3,4,5,6,7,8,9,10,11',
+]
+
+@pytest.fixture
+def edge_case_csv(tmp_path):
+    path = tmp_path / '联赛_20250701.csv'
+    path.write_text('\n'.join(EDGE_CASE_ROWS) + '\n', encoding='utf-8')
+    return str(path)
+
+def test_block_read_matches_full_read(edge_case_csv):
+    full = GuildLeagueProcessorAdvanced(edge_case_csv)
+    assert full.load_match_data()
+    assert full.guild_names == ['甲帮', '乙帮']
+
+    for name, df in zip(full.guild_names, full.guild_dfs):
+        partial = GuildLeagueProcessorAdvanced(edge_case_csv, guilds=[name])
+        assert partial.load_match_data()
+        assert partial.guild_names == [name]
+        pd.testing.assert_frame_equal(partial.guild_dfs[0].reset_index(drop=True), df.reset_index(drop=True))
+
+def test_block_index_is_reused(edge_case_csv):
+    first = GuildLeagueProcessorAdvanced(edge_case_csv, guilds=['乙帮'])
+    assert first.load_match_data()
+    assert os.path.exists(edge_case_csv + '.blocks.json')
+
+    second = GuildLeagueProcessorAdvanced(edge_case_csv, guilds=['乙帮'])
+    assert second.load_match_data()
+    pd.testing.assert_frame_equal(first.guild_dfs[0], second.guild_dfs[0])